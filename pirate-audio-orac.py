@@ -2,67 +2,615 @@ from PIL import Image
 from PIL import ImageDraw
 from PIL import ImageFont
 from ST7789 import ST7789
+from pythonosc import osc_packet
 from pythonosc.dispatcher import Dispatcher
-from pythonosc.osc_server import BlockingOSCUDPServer
+from pythonosc.osc_bundle_builder import IMMEDIATELY
+from pythonosc.osc_bundle_builder import OscBundleBuilder
+from pythonosc.osc_message_builder import OscMessageBuilder
+from pythonosc.osc_server import AsyncIOOSCUDPServer
 from pythonosc.udp_client import SimpleUDPClient
 
 import RPi.GPIO as GPIO
+import array
+import asyncio
+import bisect
+import collections
 import json
+import math
 import netifaces as ni
+import numpy as np
 import os
+import queue
 import random
 import signal
+import socket
+import struct
 import sys
+import threading
+import time
+import zlib
+
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+LOG_ERROR = 40
 
 class Logger():
-    def log(self, source, log_text):
-        print("[%s] %s" % (source, log_text))
+    # records are formatted on the writer thread, and only if their level is
+    # enabled for their source; every record also goes to an in-memory ring
+    # buffer that can be dumped on demand
+    DEFAULT_LEVEL = LOG_INFO
+    RING_BUFFER_SIZE = 1000
+
+    level = LOG_INFO
+    source_level_map = None
+    ring_buffer = None
+    write_queue = None
+    writer_thread = None
+
+    def __init__(self):
+        self.level = self.DEFAULT_LEVEL
+        self.source_level_map = {}
+        self.ring_buffer = collections.deque(maxlen=self.RING_BUFFER_SIZE)
+        self.write_queue = queue.SimpleQueue()
+        self.writer_thread = threading.Thread(target=self.run_writer, name="LogWriter", daemon=True)
+        self.writer_thread.start()
+
+    def set_level(self, level, source=None):
+        if source is None:
+            self.level = level
+        else:
+            self.source_level_map[source] = level
+
+    def is_enabled(self, source, level):
+        return level >= self.source_level_map.get(source, self.level)
+
+    def log(self, source, log_text, *args, level=LOG_DEBUG):
+        record = (time.time(), level, source, log_text, args)
+        self.ring_buffer.append(record)
+        if self.is_enabled(source, level):
+            self.write_queue.put((record, False))
+
+    def dump_ring_buffer(self):
+        for record in list(self.ring_buffer):
+            self.write_queue.put((record, True))
+
+    def get_ring_buffer_lines(self):
+        return [self.format_record(record, True) for record in list(self.ring_buffer)]
+
+    def get_stats(self):
+        return {
+                "queued": self.write_queue.qsize(),
+                "ring_buffer": len(self.ring_buffer)
+                }
+
+    def format_record(self, record, with_time):
+        record_time, level, source, log_text, args = record
+        if len(args) > 0:
+            try:
+                log_text = log_text % args
+            except (TypeError, ValueError):
+                log_text = "%s %s" % (log_text, str(args))
+        if with_time:
+            return "%.3f [%s] %s" % (record_time, source, log_text)
+        return "[%s] %s" % (source, log_text)
+
+    def run_writer(self):
+        while True:
+            record, with_time = self.write_queue.get()
+            print(self.format_record(record, with_time), flush=True)
 
 logger = Logger()
 def get_logger():
     return logger
 
+class Histogram:
+    # latency histogram with power-of-two buckets, the first one ending at
+    # BASE_SECONDS and the last one open-ended
+    BASE_SECONDS = 0.000025
+    BUCKET_COUNT = 18
+
+    __slots__ = ("count", "total", "max", "bucket_counts")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bucket_counts = [0] * self.BUCKET_COUNT
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = 0
+        if seconds > self.BASE_SECONDS:
+            mantissa, index = math.frexp(seconds / self.BASE_SECONDS)
+            if mantissa == 0.5:
+                # bounds are inclusive, an exact power of two belongs below
+                index -= 1
+        self.bucket_counts[min(index, self.BUCKET_COUNT - 1)] += 1
+
+    def get_bucket_bound(self, index):
+        return self.BASE_SECONDS * (1 << index)
+
+    def get_percentile(self, pct):
+        # upper bound of the bucket holding the pct-th observation
+        target = self.count * pct / 100.0
+        total = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            total += bucket_count
+            if total >= target and total > 0:
+                return min(self.get_bucket_bound(index), self.max)
+        return self.max
+
+    def to_obj(self):
+        return {
+                "count": self.count,
+                "mean_ms": round(self.total / self.count * 1000, 3) if self.count > 0 else 0.0,
+                "max_ms": round(self.max * 1000, 3),
+                "p50_ms": round(self.get_percentile(50) * 1000, 3),
+                "p95_ms": round(self.get_percentile(95) * 1000, 3),
+                "p99_ms": round(self.get_percentile(99) * 1000, 3),
+                # [upper bound in ms, count] in bound order, sort_keys would reorder a dict
+                "buckets_ms": [ [round(self.get_bucket_bound(index) * 1000, 3), bucket_count]
+                    for index, bucket_count in enumerate(self.bucket_counts) if bucket_count > 0 ]
+                }
+
+class Metrics:
+    # counters and latency histograms per processing stage, plus gauges that
+    # are read from their owners when the stats are queried
+    start_time = 0.0
+    lock = None
+    counter_map = None
+    histogram_map = None
+    gauge_map = None
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        # counted from the event loop, render, GPIO and mirror threads
+        self.lock = threading.Lock()
+        self.counter_map = {}
+        self.histogram_map = {}
+        self.gauge_map = {}
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counter_map[name] = self.counter_map.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histogram_map.get(name)
+            if histogram is None:
+                histogram = self.histogram_map[name] = Histogram()
+            histogram.observe(seconds)
+
+    def add_gauge(self, name, getter):
+        with self.lock:
+            self.gauge_map[name] = getter
+
+    def get_stats(self):
+        with self.lock:
+            counter_map = dict(self.counter_map)
+            gauge_list = list(self.gauge_map.items())
+            histogram_map = { name: histogram.to_obj() for name, histogram in self.histogram_map.items() }
+        # gauges take their owners' locks, read them without holding ours
+        return {
+                "uptime": round(time.monotonic() - self.start_time, 3),
+                "counters": counter_map,
+                "gauges": { name: getter() for name, getter in gauge_list },
+                "histograms": histogram_map
+                }
+
+metrics = Metrics()
+metrics.add_gauge("log", logger.get_stats)
+
+def get_metrics():
+    return metrics
+
+class Trace:
+    __slots__ = ("trace_id", "kind", "button", "start_time", "stage_list")
+
+    def __init__(self, trace_id, kind, button, start_time):
+        self.trace_id = trace_id
+        self.kind = kind
+        self.button = button
+        self.start_time = start_time
+        self.stage_list = []
+
+    def to_obj(self):
+        return {
+                "id": self.trace_id,
+                "kind": self.kind,
+                "button": self.button,
+                "start": round(self.start_time, 6),
+                "stages": [(stage, round((stage_time - self.start_time) * 1000, 3)) for stage, stage_time in self.stage_list]
+                }
+
+class LatencyTracer:
+    # follows a button edge (or autorepeat tick) through the controller to
+    # the end of the Screen.update() that shows its result. begin / mark /
+    # submit / end run on the event loop, take_pending / complete on the
+    # RenderWorker; traces that never request a redraw are dropped
+    # set ORAC_TRACE_PATH to a file path to also write every trace as a JSON line
+    TRACE_PATH = os.environ.get("ORAC_TRACE_PATH")
+
+    next_trace_id = 1
+    active_trace = None
+    pending_trace_list = None
+    lock = None
+    trace_file = None
+
+    def __init__(self):
+        self.pending_trace_list = []
+        self.lock = threading.Lock()
+
+    def begin(self, kind, button, start_time):
+        self.active_trace = Trace(self.next_trace_id, kind, button, start_time)
+        self.next_trace_id += 1
+        self.mark("handled")
+
+    def mark(self, stage):
+        if self.active_trace is not None:
+            self.active_trace.stage_list.append((stage, time.monotonic()))
+
+    def submit(self):
+        # the active trace waits for the next frame
+        trace = self.active_trace
+        if trace is None:
+            return
+        self.mark("perform")
+        self.active_trace = None
+        with self.lock:
+            self.pending_trace_list.append(trace)
+
+    def end(self):
+        self.active_trace = None
+
+    def take_pending(self):
+        with self.lock:
+            trace_list = self.pending_trace_list
+            self.pending_trace_list = []
+        return trace_list
+
+    def complete(self, trace_list, render_start_time, render_end_time, display_end_time):
+        for trace in trace_list:
+            trace.stage_list.append(("render_start", render_start_time))
+            trace.stage_list.append(("render", render_end_time))
+            trace.stage_list.append(("display", display_end_time))
+            get_metrics().observe("button_to_photon_" + trace.kind, display_end_time - trace.start_time)
+            if self.TRACE_PATH:
+                self.write_trace(trace)
+
+    def write_trace(self, trace):
+        if self.trace_file is None:
+            self.trace_file = open(self.TRACE_PATH, "a")
+        self.trace_file.write(json.dumps(trace.to_obj(), separators=(",", ":")) + "\n")
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+tracer = LatencyTracer()
+
+def get_tracer():
+    return tracer
+
+CHANGE_RACK = 0 # a whole rack was reset, loaded or got a new slot order
+CHANGE_RACK_LIST = 1 # a rack was added or removed, or another one became active
+CHANGE_SLOT = 2 # a module was put into a slot
+CHANGE_MODULE = 3 # pages or params were added to a module
+CHANGE_PARAM = 4 # the current value of a param
+CHANGE_PRESET = 5
+CHANGE_RESOURCE = 6
+CHANGE_LEARN = 7 # midi / modulation learn mode
+CHANGE_KIND_LIST = range(8)
+CHANGE_KIND_NAMES = ["rack", "rack_list", "slot", "module", "param", "preset", "resource", "learn"]
+
+class ModelChange:
+    __slots__ = ("kind", "rack_id", "slot_id", "param_id", "version")
+
+    def __init__(self, kind, rack_id, slot_id, param_id, version):
+        self.kind = kind
+        self.rack_id = rack_id
+        self.slot_id = slot_id
+        self.param_id = param_id
+        self.version = version
+
+class ModelChangeBus:
+    # the model reports every change here and each one gets the next version
+    # from a single counter. While a batch is open the changes are coalesced
+    # and delivered when it ends
+    version = 0
+    subscriber_map = None # kind -> [callback(change)]
+    batch_depth = 0
+    pending_map = None # (kind, rack_id, slot_id, param_id) -> latest change, while batching
+
+    def __init__(self):
+        self.subscriber_map = { kind: [] for kind in CHANGE_KIND_LIST }
+        get_metrics().add_gauge("model", self.get_stats)
+
+    def next_version(self):
+        self.version += 1
+        return self.version
+
+    def subscribe(self, kind_list, callback):
+        for kind in kind_list:
+            self.subscriber_map[kind].append(callback)
+
+    def emit(self, kind, rack_id, slot_id=None, param_id=None):
+        change = ModelChange(kind, rack_id, slot_id, param_id, self.next_version())
+        get_metrics().count("model_change_" + CHANGE_KIND_NAMES[kind])
+        if self.batch_depth > 0:
+            self.pending_map[(kind, rack_id, slot_id, param_id)] = change
+            return
+        self.deliver(change)
+
+    def deliver(self, change):
+        for callback in self.subscriber_map[change.kind]:
+            callback(change)
+
+    def begin_batch(self):
+        if self.batch_depth == 0:
+            self.pending_map = collections.OrderedDict()
+        self.batch_depth += 1
+
+    def end_batch(self):
+        if self.batch_depth == 0:
+            return
+        self.batch_depth -= 1
+        if self.batch_depth > 0:
+            return
+        change_list = list(self.pending_map.values())
+        self.pending_map = None
+        for change in change_list:
+            self.deliver(change)
+
+    def get_stats(self):
+        return {
+                "version": self.version,
+                "pending": 0 if self.pending_map is None else len(self.pending_map),
+                "subscribers": sum(len(callback_list) for callback_list in self.subscriber_map.values())
+                }
+
+change_bus = ModelChangeBus()
+
+def get_change_bus():
+    return change_bus
+
+class ResourceList:
+    # insertion-ordered set of resource names with O(1) membership and
+    # position lookups. Runs of items sharing a jump key (the category of
+    # "synth/brdsmono", the first letter of "Init") are indexed as they
+    # arrive so long lists can be crossed a run at a time
+    item_list = None
+    index_map = None # item -> position
+    run_start_list = None # positions where the jump key differs from the previous item
+    last_jump_key = None
+
+    def __init__(self, item_list=()):
+        self.item_list = []
+        self.index_map = {}
+        self.run_start_list = []
+        for item in item_list:
+            self.add(item)
+
+    @staticmethod
+    def get_item_jump_key(item):
+        if "/" in item:
+            return item.split("/", 1)[0]
+        return item[:1].upper()
+
+    def add(self, item):
+        if item in self.index_map:
+            return False
+        index = len(self.item_list)
+        self.index_map[item] = index
+        self.item_list.append(item)
+        jump_key = self.get_item_jump_key(item)
+        if index == 0 or jump_key != self.last_jump_key:
+            self.run_start_list.append(index)
+            self.last_jump_key = jump_key
+        return True
+
+    def __contains__(self, item):
+        return item in self.index_map
+
+    def __len__(self):
+        return len(self.item_list)
+
+    def __getitem__(self, index):
+        return self.item_list[index]
+
+    def __iter__(self):
+        return iter(self.item_list)
+
+    def index(self, item):
+        index = self.index_map.get(item)
+        if index is None:
+            raise ValueError("%r is not in the list" % (item,))
+        return index
+
+    def get_next_jump_index(self, index):
+        # start of the run after the one holding index, None in the last run
+        run_index = bisect.bisect_right(self.run_start_list, index)
+        if run_index < len(self.run_start_list):
+            return self.run_start_list[run_index]
+        return None
+
+    def get_previous_jump_index(self, index):
+        # start of the run holding index, or of the run before when already there
+        run_index = bisect.bisect_left(self.run_start_list, index) - 1
+        if run_index >= 0:
+            return self.run_start_list[run_index]
+        return None
+
+    def to_obj(self):
+        return list(self.item_list)
+
+class ResourceTreeNode:
+    # one path segment; a node is a resource, a category or both ("mixer" and
+    # "mixer/sub"). Its parent lists it once per role, as "mixer" and "mixer/",
+    # in the order the roles became known. The entry list an ItemSelectView
+    # shows is only built when the node is first opened
+    __slots__ = ("name", "path", "parent", "child_map", "child_list", "entry_list", "entry_label_list", "resource")
+
+    def __init__(self, name, path, parent):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.child_map = {}
+        self.child_list = []
+        self.entry_list = None # [(child, is_category)]
+        self.entry_label_list = None
+        self.resource = None # full resource path when a resource ends here
+
+    def is_category(self):
+        return len(self.child_list) > 0
+
+    def get_entry_label(self, is_category):
+        return self.name + "/" if is_category else self.name
+
+    def add_child(self, child):
+        self.child_map[child.name] = child
+        self.child_list.append(child)
+        if len(self.child_list) == 1 and self.parent is not None:
+            self.parent.add_entry(self, True)
+
+    def set_resource(self, resource):
+        if self.resource is None:
+            self.resource = resource
+            self.parent.add_entry(self, False)
+
+    def add_entry(self, child, is_category):
+        if self.entry_list is not None:
+            self.entry_list.append((child, is_category))
+            self.entry_label_list.add(child.get_entry_label(is_category))
+
+    def build_entry_list(self):
+        self.entry_list = []
+        self.entry_label_list = ResourceList()
+        for child in self.child_list:
+            if child.resource is not None:
+                self.entry_list.append((child, False))
+                self.entry_label_list.add(child.get_entry_label(False))
+            if child.is_category():
+                self.entry_list.append((child, True))
+                self.entry_label_list.add(child.get_entry_label(True))
+
+    def get_entry(self, entry_index):
+        if self.entry_list is None:
+            self.build_entry_list()
+        return self.entry_list[entry_index]
+
+    def get_entry_label_list(self):
+        if self.entry_list is None:
+            self.build_entry_list()
+        return self.entry_label_list
+
+class ResourceTree:
+    # prefix tree over "/"-separated resource paths like "synth/brdsmono",
+    # extended one resource at a time while a publish is ingested
+    root = None
+    node_map = None # path -> node, for categories and resources
+
+    def __init__(self, resource_list=()):
+        self.root = ResourceTreeNode("", "", None)
+        self.node_map = {}
+        for resource in resource_list:
+            self.add(resource)
+
+    def add(self, resource):
+        node = self.root
+        path = ""
+        for name in resource.split("/"):
+            path = path + "/" + name if len(path) > 0 else name
+            child = node.child_map.get(name)
+            if child is None:
+                child = ResourceTreeNode(name, path, node)
+                self.node_map[path] = child
+                node.add_child(child)
+            node = child
+        node.set_resource(resource)
+
+    def get_root(self):
+        return self.root
+
+    def get_node(self, path):
+        return self.node_map.get(path)
+
 class Rack:
     rack_slot_order = None
     rack_module_map = None
     current_preset = None
     rack_resource_list = None
+    module_resource_tree = None
     rack_id = None
     midi_learn = False
     modulation_learn = False
+    is_warm = False # model from the cache or an earlier publish, replaced by the next publish
 
     def __init__(self):
-        self.reset()
+        self.clear()
 
-    def reset(self):
+    def clear(self):
+        if self.rack_module_map is not None:
+            for module in self.rack_module_map.values():
+                module.detach()
         self.rack_slot_order = "a1 a2 a3 b1 b2 b3 b4 c1 c2 c3 p1 p2 m1 m2 m3 s1 s2".split(" ")
         self.rack_module_map = {}
-        self.rack_resource_list = { "module": [], "preset": [] }
+        self.rack_resource_list = { "module": ResourceList(), "preset": ResourceList() }
+        self.module_resource_tree = ResourceTree()
+
+    def reset(self):
+        self.clear()
+        self.notify_changed(CHANGE_RACK)
+
+    def notify_changed(self, kind, slot_id=None, param_id=None):
+        get_change_bus().emit(kind, self.rack_id, slot_id, param_id)
 
     def set_id(self, rack_id):
         self.rack_id = rack_id
 
     def set_module(self, slot_id, module):
+        old_module = self.rack_module_map.get(slot_id)
+        if old_module is not None:
+            old_module.detach()
         self.rack_module_map[slot_id] = module
+        module.attach(self, slot_id)
+        self.notify_changed(CHANGE_SLOT, slot_id)
 
     def set_current_preset(self, preset):
-        self.current_preset = preset
+        if preset != self.current_preset:
+            self.current_preset = preset
+            self.notify_changed(CHANGE_PRESET)
 
     def set_midi_learn(self, midi_learn):
-        self.midi_learn = midi_learn
+        if midi_learn != self.midi_learn:
+            self.midi_learn = midi_learn
+            self.notify_changed(CHANGE_LEARN)
 
     def set_modulation_learn(self, modulation_learn):
-        self.modulation_learn = modulation_learn
+        if modulation_learn != self.modulation_learn:
+            self.modulation_learn = modulation_learn
+            self.notify_changed(CHANGE_LEARN)
 
     def add_resource_item(self, res_type, res):
         if res_type == "moduleorder":
             self.rack_slot_order = res.split(" ")
-        elif res_type in self.rack_resource_list and res not in self.rack_resource_list[res_type]:
-            self.rack_resource_list[res_type].append(res)
+            self.notify_changed(CHANGE_RACK)
+        elif res_type in self.rack_resource_list and self.rack_resource_list[res_type].add(res):
+            if res_type == "module":
+                self.module_resource_tree.add(res)
+            self.notify_changed(CHANGE_RESOURCE)
 
     def get_id(self):
         return self.rack_id
 
+    def get_module_resource_tree(self):
+        return self.module_resource_tree
+
     def get_resource_list(self, res_type):
         if res_type in self.rack_resource_list:
             return self.rack_resource_list[res_type]
@@ -92,28 +640,62 @@ class Rack:
 
     def to_obj(self):
         return {
+                "rack_id": self.rack_id,
+                "current_preset": self.current_preset,
                 "slot_order": self.rack_slot_order,
+                "resource_list": { k: v.to_obj() for k, v in self.rack_resource_list.items() },
                 "module_map": { k: v.to_obj() for k, v in self.rack_module_map.items() }
                 }
 
+    def load_obj(self, obj):
+        self.clear()
+        self.rack_id = obj["rack_id"]
+        self.current_preset = obj["current_preset"]
+        self.rack_slot_order = obj["slot_order"]
+        for res_type, res_list in obj["resource_list"].items():
+            self.rack_resource_list[res_type] = ResourceList(res_list)
+        self.module_resource_tree = ResourceTree(self.rack_resource_list["module"])
+        for slot_id, module_obj in obj["module_map"].items():
+            module = Module.from_obj(module_obj)
+            self.rack_module_map[slot_id] = module
+            module.attach(self, slot_id)
+        self.notify_changed(CHANGE_RACK)
+
 class Module:
     # /Kontrol/module ssss "127.0.0.1:6001" "a1" "Brds Mono" "synth/brdsmono"
     module_label = ""
     module_id = ""
     module_page_list = None
-    module_param_map = None
+    module_param_table = None
+    rack = None # set while the module sits in a rack slot, changes are reported through it
+    slot_id = None
 
     def __init__(self, module_label, module_id):
         self.module_label = module_label
         self.module_id = module_id
         self.module_page_list = []
-        self.module_param_map = {}
+        self.module_param_table = ModuleParamTable(self)
+
+    def attach(self, rack, slot_id):
+        self.rack = rack
+        self.slot_id = slot_id
+
+    def detach(self):
+        self.rack = None
+        self.slot_id = None
+
+    def notify_changed(self, kind, param_id=None):
+        if self.rack is not None:
+            self.rack.notify_changed(kind, self.slot_id, param_id)
 
     def add_page(self, page):
         self.module_page_list.append(page)
+        self.notify_changed(CHANGE_MODULE)
 
-    def add_param(self, param):
-        self.module_param_map[param.get_id()] = param
+    def add_param(self, param_type, param_id, param_label, param_range, param_default):
+        param = self.module_param_table.add_param(param_type, param_id, param_label, param_range, param_default)
+        self.notify_changed(CHANGE_MODULE)
+        return param
 
     def get_id(self):
         return self.module_id
@@ -130,18 +712,30 @@ class Module:
         return None
 
     def get_param(self, param_id):
-        if param_id in self.module_param_map:
-            return self.module_param_map[param_id]
-        return None
+        return self.module_param_table.get_param(param_id)
+
+    def get_param_table(self):
+        return self.module_param_table
 
     def to_obj(self):
         return {
                 "module_label": self.module_label,
                 "module_id": self.module_id,
                 "page_list": [ p.to_obj() for p in self.module_page_list ],
-                "param_map": { k: v.to_obj() for k, v in self.module_param_map.items() }
+                "param_map": self.module_param_table.to_obj()
                 }
 
+    @staticmethod
+    def from_obj(obj):
+        module = Module(obj["module_label"], obj["module_id"])
+        for page_obj in obj["page_list"]:
+            module.add_page(ModulePage(page_obj["page_id"], page_obj["page_label"], page_obj["param_order"]))
+        for param_obj in obj["param_map"].values():
+            param = module.add_param(param_obj["param_type"], param_obj["param_id"], param_obj["param_label"],
+                    (param_obj["param_min"], param_obj["param_max"]), param_obj["param_default"])
+            param.set_current(param_obj["param_current"])
+        return module
+
 class ModulePage:
     # /Kontrol/page ssssssss "127.0.0.1:6001" "a1" "pg_osc" "Oscillator" "o_shape" "o_colour" "o_timbre" "o_transpose"
     page_id = ""
@@ -151,7 +745,7 @@ class ModulePage:
     def __init__(self, page_id, page_label, page_param_order):
         self.page_id = page_id
         self.page_label = page_label
-        self.page_param_order = page_param_order
+        self.page_param_order = tuple(sys.intern(param_id) for param_id in page_param_order)
 
     def get_id(self):
         return self.page_id
@@ -192,119 +786,172 @@ PARAM_TYPE_OFFSET_LEVEL = {
         "pan": [0.01, 0.05, 0.1, 0.2]
 }
 
-class ModuleParam:
-    # /Kontrol/param sssssfff "127.0.0.1:6001" "a1" "pct" "o_colour" "Colour" 0.000000 100.000000 50.000000
-    # type: pct / freq / time / pitch / int / bool / pan
-    param_type = "pct"
-    param_id = ""
-    param_label = ""
-    param_min = 0.0
-    param_max = 100.0
-    param_default = 50.0
-    param_current = 50.0
-
-    def __init__(self, param_type, param_id, param_label, param_range, param_default):
-        self.param_type = param_type
-        self.param_id = param_id
-        self.param_label = param_label
+class ModuleParamTable:
+    # all params of a module stored column-wise, one row per param;
+    # ids, types and labels are interned since they repeat across modules
+    __slots__ = (
+            "module",
+            "param_index_map",
+            "param_type_list",
+            "param_id_list",
+            "param_label_list",
+            "param_min_list",
+            "param_max_list",
+            "param_default_list",
+            "param_current_list",
+            )
+
+    def __init__(self, module=None):
+        self.module = module
+        self.param_index_map = {}
+        self.param_type_list = []
+        self.param_id_list = []
+        self.param_label_list = []
+        self.param_min_list = array.array("d")
+        self.param_max_list = array.array("d")
+        self.param_default_list = array.array("d")
+        self.param_current_list = array.array("d")
+
+    def add_param(self, param_type, param_id, param_label, param_range, param_default):
+        # /Kontrol/param sssssfff "127.0.0.1:6001" "a1" "pct" "o_colour" "Colour" 0.000000 100.000000 50.000000
+        # type: pct / freq / time / pitch / int / bool / pan
         if param_type != "bool":
-            self.param_min = param_range[0]
-            self.param_max = param_range[1]
+            param_min, param_max = param_range[0], param_range[1]
         else:
-            self.param_min = 0.0
-            self.param_max = 1.0
-        self.param_default = param_default
-        self.param_current = param_default
-    
+            param_min, param_max = 0.0, 1.0
+        param_index = self.param_index_map.get(param_id)
+        if param_index is None:
+            param_index = len(self.param_id_list)
+            param_id = sys.intern(param_id)
+            self.param_index_map[param_id] = param_index
+            self.param_type_list.append(sys.intern(param_type))
+            self.param_id_list.append(param_id)
+            self.param_label_list.append(sys.intern(param_label))
+            self.param_min_list.append(param_min)
+            self.param_max_list.append(param_max)
+            self.param_default_list.append(param_default)
+            self.param_current_list.append(param_default)
+        else:
+            self.param_type_list[param_index] = sys.intern(param_type)
+            self.param_label_list[param_index] = sys.intern(param_label)
+            self.param_min_list[param_index] = param_min
+            self.param_max_list[param_index] = param_max
+            self.param_default_list[param_index] = param_default
+            self.param_current_list[param_index] = param_default
+        return ModuleParam(self, param_index)
+
+    def set_current(self, param_index, value):
+        if self.param_current_list[param_index] == value:
+            return
+        self.param_current_list[param_index] = value
+        if self.module is not None:
+            self.module.notify_changed(CHANGE_PARAM, self.param_id_list[param_index])
+
+    def get_param(self, param_id):
+        param_index = self.param_index_map.get(param_id)
+        if param_index is None:
+            return None
+        return ModuleParam(self, param_index)
+
+    def get_param_len(self):
+        return len(self.param_id_list)
+
+    def to_obj(self):
+        return { param_id: ModuleParam(self, i).to_obj() for i, param_id in enumerate(self.param_id_list) }
+
+class ModuleParam:
+    # view onto one row of a ModuleParamTable
+    # type: pct / freq / time / pitch / int / bool / pan
+    __slots__ = ("param_table", "param_index")
+
+    def __init__(self, param_table, param_index):
+        self.param_table = param_table
+        self.param_index = param_index
+
     def get_type(self):
-        return self.param_type
+        return self.param_table.param_type_list[self.param_index]
 
     def get_id(self):
-        return self.param_id
+        return self.param_table.param_id_list[self.param_index]
 
     def get_label(self):
-        return self.param_label
+        return self.param_table.param_label_list[self.param_index]
 
     def get_min(self):
-        return self.param_min
+        return self.param_table.param_min_list[self.param_index]
 
     def get_max(self):
-        return self.param_max
+        return self.param_table.param_max_list[self.param_index]
 
     def get_default(self):
-        return self.param_default
+        return self.param_table.param_default_list[self.param_index]
 
     def get_current(self):
-        return self.param_current
+        return self.param_table.param_current_list[self.param_index]
 
     def get_current_str(self):
         # type: pct / freq / time / pitch / int / bool / pan
-        if self.param_type == "bool":
-            return "ON" if self.param_current == 1.0 else "OFF"
-        elif self.param_type == "pan":
-            if self.param_current == 0.5:
+        param_type = self.get_type()
+        param_current = self.get_current()
+        if param_type == "bool":
+            return "ON" if param_current == 1.0 else "OFF"
+        elif param_type == "pan":
+            if param_current == 0.5:
                 return "C"
-            elif self.param_current < 0.5:
-                return "L %.0f" % (200 * (0.5 - self.param_current))
+            elif param_current < 0.5:
+                return "L %.0f" % (200 * (0.5 - param_current))
             else:
-                return "%.0f R" % (200 * (self.param_current - 0.5))
+                return "%.0f R" % (200 * (param_current - 0.5))
         else:
             fmt = "(%.2f)"
-            if self.param_type in PARAM_TYPE_FORMAT_STRING:
-                fmt = PARAM_TYPE_FORMAT_STRING[self.param_type]
-            return fmt % self.param_current
+            if param_type in PARAM_TYPE_FORMAT_STRING:
+                fmt = PARAM_TYPE_FORMAT_STRING[param_type]
+            return fmt % param_current
 
     def get_current_pct(self):
-        return 100.0 * (self.param_current - self.param_min) / (self.param_max - self.param_min)
+        param_min = self.get_min()
+        return 100.0 * (self.get_current() - param_min) / (self.get_max() - param_min)
 
     def get_offset_delta(self, offset_level):
-        return PARAM_TYPE_OFFSET_LEVEL[self.param_type][offset_level]
+        return PARAM_TYPE_OFFSET_LEVEL[self.get_type()][offset_level]
 
     def set_current(self, value):
-        self.param_current = value
+        self.param_table.set_current(self.param_index, value)
 
     def decrease_current(self, offset_level):
-        self.param_current -= self.get_offset_delta(offset_level)
-        if self.param_current < self.param_min:
-            self.param_current = self.param_min
+        self.set_current(max(self.get_current() - self.get_offset_delta(offset_level), self.get_min()))
 
     def increase_current(self, offset_level):
-        self.param_current += self.get_offset_delta(offset_level)
-        if self.param_current > self.param_max:
-            self.param_current = self.param_max
+        self.set_current(min(self.get_current() + self.get_offset_delta(offset_level), self.get_max()))
 
     def to_obj(self):
         return {
-                "param_type": self.param_type,
-                "param_id": self.param_id,
-                "param_label": self.param_label,
-                "param_min": self.param_min,
-                "param_max": self.param_max,
-                "param_default": self.param_default,
-                "param_current": self.param_current
+                "param_type": self.get_type(),
+                "param_id": self.get_id(),
+                "param_label": self.get_label(),
+                "param_min": self.get_min(),
+                "param_max": self.get_max(),
+                "param_default": self.get_default(),
+                "param_current": self.get_current()
                 }
 
-rack = Rack()
-
-def get_rack():
-    return rack
-
-def get_rack_id():
-    return get_rack().get_id()
-
 class RackViewState:
+    rack = None
     slot_index = 0
     page_index = 0
 
+    def __init__(self, rack):
+        self.rack = rack
+
     def reset(self):
         self.slot_index = 0
         self.page_index = 0
 
     def get_active_slot_id(self):
-        return get_rack().get_slot_id(self.slot_index)
+        return self.rack.get_slot_id(self.slot_index)
 
     def get_active_slot_module(self):
-        return get_rack().get_slot_module(self.get_active_slot_id())
+        return self.rack.get_slot_module(self.get_active_slot_id())
 
     def get_active_slot_module_page(self):
         if self.get_active_slot_module() is None:
@@ -319,10 +966,406 @@ class RackViewState:
             return None
         return self.get_active_slot_module().get_param(param_id)
 
-rack_view_state = RackViewState()
+class RackRegistry:
+    # every rack MEC has announced, keyed by rack id (the first argument of
+    # most /Kontrol messages); each keeps its model and view position so the
+    # UI can switch between them without a republish
+    rack_map = None # rack_id -> Rack, in announce order
+    view_state_map = None # rack_id -> RackViewState
+    active_rack_id = None
+    empty_rack = None # shown until the first rack is known
+    empty_view_state = None
+
+    def __init__(self):
+        self.reset()
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("RackRegistry", log_text, *args, level=level)
+
+    def reset(self):
+        self.rack_map = collections.OrderedDict()
+        self.view_state_map = {}
+        self.active_rack_id = None
+        self.empty_rack = Rack()
+        self.empty_view_state = RackViewState(self.empty_rack)
+
+    def get_rack(self, rack_id):
+        return self.rack_map.get(rack_id)
+
+    def add_rack(self, rack_id):
+        rack = self.rack_map.get(rack_id)
+        if rack is None:
+            self.log("add rack %s", rack_id, level=LOG_INFO)
+            rack = Rack()
+            rack.set_id(rack_id)
+            self.rack_map[rack_id] = rack
+            self.view_state_map[rack_id] = RackViewState(rack)
+            if self.active_rack_id is None:
+                self.active_rack_id = rack_id
+            get_change_bus().emit(CHANGE_RACK_LIST, rack_id)
+        return rack
+
+    def remove_rack(self, rack_id):
+        if rack_id not in self.rack_map:
+            return
+        self.log("remove rack %s", rack_id, level=LOG_INFO)
+        del self.rack_map[rack_id]
+        del self.view_state_map[rack_id]
+        if self.active_rack_id == rack_id:
+            self.active_rack_id = next(iter(self.rack_map), None)
+        get_change_bus().emit(CHANGE_RACK_LIST, rack_id)
+
+    def get_rack_ids(self):
+        return list(self.rack_map.keys())
+
+    def get_view_state(self, rack_id):
+        return self.view_state_map.get(rack_id)
+
+    def set_active_rack_id(self, rack_id):
+        if rack_id in self.rack_map and rack_id != self.active_rack_id:
+            self.active_rack_id = rack_id
+            get_change_bus().emit(CHANGE_RACK_LIST, rack_id)
+
+    def get_active_rack(self):
+        if self.active_rack_id is None:
+            return self.empty_rack
+        return self.rack_map[self.active_rack_id]
+
+    def get_active_view_state(self):
+        if self.active_rack_id is None:
+            return self.empty_view_state
+        return self.view_state_map[self.active_rack_id]
+
+rack_registry = RackRegistry()
+
+def get_rack_registry():
+    return rack_registry
+
+def get_rack():
+    return rack_registry.get_active_rack()
+
+def get_rack_id():
+    return get_rack().get_id()
 
 def get_rack_view_state():
-    return rack_view_state
+    return rack_registry.get_active_view_state()
+
+class RackCache:
+    # last known racks and their view positions, so the first frame after a
+    # restart shows the racks before MEC has republished them
+    CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pirate-audio-orac", "rack.cache")
+    SAVE_DELAY = 10.0
+
+    save_timer = None
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("RackCache", log_text, *args, level=level)
+
+    # remote param values (modulation can move them all the time) are not
+    # worth an SD card write each; they go out with the next structural
+    # change, a local edit or the save at shutdown
+    SAVE_CHANGE_KIND_LIST = [CHANGE_RACK, CHANGE_RACK_LIST, CHANGE_SLOT, CHANGE_MODULE, CHANGE_PRESET, CHANGE_RESOURCE]
+
+    def start(self):
+        # changes after the initial load are saved
+        get_change_bus().subscribe(self.SAVE_CHANGE_KIND_LIST, self.handle_model_change)
+
+    def handle_model_change(self, change):
+        self.schedule_save()
+
+    def load(self):
+        registry = get_rack_registry()
+        try:
+            with open(self.CACHE_PATH, "rb") as f:
+                obj = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+            for rack_obj in obj["rack_list"]:
+                rack = registry.add_rack(rack_obj["rack"]["rack_id"])
+                rack.load_obj(rack_obj["rack"])
+                rack.is_warm = True
+                view_state = registry.get_view_state(rack.get_id())
+                view_state.slot_index = rack_obj["slot_index"]
+                view_state.page_index = rack_obj["page_index"]
+            registry.set_active_rack_id(obj["active_rack_id"])
+        except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+            self.log("no usable cache: %s", e, level=LOG_INFO)
+            registry.reset()
+            return False
+        self.log("loaded racks %s", registry.get_rack_ids(), level=LOG_INFO)
+        return True
+
+    def save(self):
+        if self.save_timer is not None:
+            self.save_timer.cancel()
+            self.save_timer = None
+        registry = get_rack_registry()
+        if len(registry.get_rack_ids()) == 0:
+            return
+        rack_list = []
+        for rack_id in registry.get_rack_ids():
+            view_state = registry.get_view_state(rack_id)
+            rack_list.append({
+                "rack": registry.get_rack(rack_id).to_obj(),
+                "slot_index": view_state.slot_index,
+                "page_index": view_state.page_index
+                })
+        obj = {
+                "active_rack_id": registry.active_rack_id,
+                "rack_list": rack_list
+                }
+        data = zlib.compress(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+        try:
+            os.makedirs(os.path.dirname(self.CACHE_PATH), exist_ok=True)
+            with open(self.CACHE_PATH + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(self.CACHE_PATH + ".tmp", self.CACHE_PATH)
+        except OSError as e:
+            self.log("save failed: %s", e, level=LOG_WARNING)
+            return
+        self.log("saved %d bytes", len(data))
+
+    def schedule_save(self):
+        if self.save_timer is None:
+            self.save_timer = get_event_loop().call_later(self.SAVE_DELAY, self.save)
+
+rack_cache = RackCache()
+
+def get_rack_cache():
+    return rack_cache
+
+# timers, OSC I/O and button handling all run on this loop; only the
+# RenderWorker thread renders and talks to the panel
+event_loop = asyncio.new_event_loop()
+
+def get_event_loop():
+    return event_loop
+
+class ChangedOutputStage:
+    # the first /Kontrol/changed after an idle period goes out immediately;
+    # later ones within the flush interval only keep the latest value per
+    # (rack_id, slot_id, param_id) and are sent together when the interval ends
+    osc_client = None
+    flush_interval = 0.0
+    flush_timer = None
+    pending_value_map = None
+    sent_count = 0
+    coalesced_count = 0
+
+    def __init__(self, osc_client, max_rate):
+        self.osc_client = osc_client
+        self.flush_interval = 1.0 / max_rate
+        self.pending_value_map = collections.OrderedDict()
+
+    def queue(self, rack_id, slot_id, param_id, value):
+        if self.flush_timer is None:
+            self.send(rack_id, slot_id, param_id, value)
+            self.flush_timer = get_event_loop().call_later(self.flush_interval, self.handle_flush_timer)
+            return
+        key = (rack_id, slot_id, param_id)
+        if key in self.pending_value_map:
+            self.coalesced_count += 1
+        self.pending_value_map[key] = value
+
+    def send(self, rack_id, slot_id, param_id, value):
+        self.sent_count += 1
+        self.osc_client.send_changed_now(rack_id, slot_id, param_id, value)
+
+    def flush(self):
+        if len(self.pending_value_map) == 0:
+            return False
+        pending_value_map = self.pending_value_map
+        self.pending_value_map = collections.OrderedDict()
+        self.osc_client.begin_bundle()
+        for (rack_id, slot_id, param_id), value in pending_value_map.items():
+            self.send(rack_id, slot_id, param_id, value)
+        self.osc_client.end_bundle()
+        return True
+
+    def handle_flush_timer(self):
+        self.flush_timer = None
+        if self.flush():
+            # keep the window open while changes keep coming
+            self.flush_timer = get_event_loop().call_later(self.flush_interval, self.handle_flush_timer)
+
+    def is_pending(self, rack_id, slot_id, param_id):
+        return (rack_id, slot_id, param_id) in self.pending_value_map
+
+    def discard(self, rack_id, slot_id, param_id):
+        self.pending_value_map.pop((rack_id, slot_id, param_id), None)
+
+    def get_stats(self):
+        return {
+                "sent": self.sent_count,
+                "coalesced": self.coalesced_count,
+                "pending": len(self.pending_value_map)
+                }
+
+ECHO_NONE = 0 # nothing of ours in flight, a plain remote change
+ECHO_LATEST = 1 # echo of the newest value we sent
+ECHO_STALE = 2 # echo of a value we have already sent a newer one after
+ECHO_CONFLICT = 3 # we have values in flight but this is none of them
+
+def to_float32(value):
+    # /Kontrol/changed carries float32, so that is the precision echoes come back with
+    return struct.unpack(">f", struct.pack(">f", value))[0]
+
+class EchoSuppressor:
+    # remembers the /Kontrol/changed values sent per (rack_id, slot_id,
+    # param_id) until MEC echoes them back, so our own changes do not hit
+    # the model and the screen a second time
+    PENDING_TIMEOUT = 2.0
+    MAX_PENDING = 32
+
+    pending_map = None # (rack_id, slot_id, param_id) -> deque of (float32 value, send time)
+
+    def __init__(self):
+        self.pending_map = {}
+
+    def add_sent(self, rack_id, slot_id, param_id, value):
+        key = (rack_id, slot_id, param_id)
+        pending = self.pending_map.get(key)
+        if pending is None:
+            pending = self.pending_map[key] = collections.deque(maxlen=self.MAX_PENDING)
+        pending.append((to_float32(value), time.monotonic()))
+
+    def match(self, rack_id, slot_id, param_id, value):
+        key = (rack_id, slot_id, param_id)
+        pending = self.pending_map.get(key)
+        if pending is None:
+            return ECHO_NONE
+        # MEC does not have to echo everything
+        expire_time = time.monotonic() - self.PENDING_TIMEOUT
+        while len(pending) > 0 and pending[0][1] < expire_time:
+            pending.popleft()
+        value = to_float32(value)
+        for index, (sent_value, _) in enumerate(pending):
+            if sent_value == value:
+                for _ in range(index + 1):
+                    pending.popleft()
+                if len(pending) == 0:
+                    del self.pending_map[key]
+                    return ECHO_LATEST
+                return ECHO_STALE
+        del self.pending_map[key]
+        return ECHO_NONE if len(pending) == 0 else ECHO_CONFLICT
+
+OSC_PATTERN_CHARS = set("*?[]{}")
+
+PACKET_INBOUND = 0
+PACKET_OUTBOUND = 1
+
+class OscCapture:
+    # binary log of every OSC packet in and out, for tools/osc_replay.py:
+    # MAGIC, start wall clock (double), then per packet the monotonic offset
+    # in ns, direction and length, followed by the raw datagram
+    MAGIC = b"ORACOSC1"
+    HEADER_FORMAT = ">d"
+    RECORD_FORMAT = ">QBI"
+
+    path = None
+    f = None
+    start_ns = 0
+    packet_count = 0
+
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "wb")
+        self.f.write(self.MAGIC)
+        self.f.write(struct.pack(self.HEADER_FORMAT, time.time()))
+        self.start_ns = time.monotonic_ns()
+
+    def write_packet(self, direction, data):
+        self.f.write(struct.pack(self.RECORD_FORMAT, time.monotonic_ns() - self.start_ns, direction, len(data)))
+        self.f.write(data)
+        self.packet_count += 1
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    @staticmethod
+    def read(path):
+        # yields (offset_seconds, direction, data)
+        record_size = struct.calcsize(OscCapture.RECORD_FORMAT)
+        with open(path, "rb") as f:
+            if f.read(len(OscCapture.MAGIC)) != OscCapture.MAGIC:
+                raise ValueError("not an OSC capture: %s" % path)
+            f.read(struct.calcsize(OscCapture.HEADER_FORMAT))
+            while True:
+                record = f.read(record_size)
+                if len(record) < record_size:
+                    return
+                offset_ns, direction, length = struct.unpack(OscCapture.RECORD_FORMAT, record)
+                yield offset_ns / 1e9, direction, f.read(length)
+
+class KontrolDispatcher(Dispatcher):
+    # all messages of an incoming bundle are handled as one model transaction;
+    # bundle time tags are ignored, messages apply as soon as they arrive.
+    # handlers are looked up in a dict keyed by the exact address, generic
+    # pattern matching only runs the first time an address is seen
+    ROUTE_MAP_MAX_SIZE = 256
+
+    begin_transaction = None
+    end_transaction = None
+    route_map = None
+    packet_listener_list = None # called with (PACKET_INBOUND, data) for every packet
+
+    def __init__(self, begin_transaction, end_transaction):
+        super().__init__()
+        self.begin_transaction = begin_transaction
+        self.end_transaction = end_transaction
+        self.route_map = {}
+        self.packet_listener_list = []
+
+    def map(self, address, handler, *args, needs_reply_address=False):
+        handler_obj = super().map(address, handler, *args, needs_reply_address=needs_reply_address)
+        self.build_route_map()
+        return handler_obj
+
+    def unmap(self, address, handler, *args, needs_reply_address=False):
+        super().unmap(address, handler, *args, needs_reply_address=needs_reply_address)
+        self.build_route_map()
+
+    def set_default_handler(self, handler, needs_reply_address=False):
+        super().set_default_handler(handler, needs_reply_address=needs_reply_address)
+        self.build_route_map()
+
+    def build_route_map(self):
+        self.route_map = {}
+        for address in list(self._map.keys()):
+            if OSC_PATTERN_CHARS.isdisjoint(address):
+                self.route_map[address] = list(super().handlers_for_address(address))
+
+    def handlers_for_address(self, address_pattern):
+        handler_list = self.route_map.get(address_pattern)
+        if handler_list is None:
+            handler_list = list(super().handlers_for_address(address_pattern))
+            if len(self.route_map) < self.ROUTE_MAP_MAX_SIZE and OSC_PATTERN_CHARS.isdisjoint(address_pattern):
+                self.route_map[address_pattern] = handler_list
+        return handler_list
+
+    def call_handlers_for_packet(self, data, client_address):
+        start_time = time.monotonic()
+        for packet_listener in self.packet_listener_list:
+            packet_listener(PACKET_INBOUND, data)
+        try:
+            packet = osc_packet.OscPacket(data)
+        except osc_packet.ParseError:
+            get_metrics().count("osc_packets_dropped")
+            return
+        get_metrics().count("osc_packets_in")
+        get_metrics().count("osc_messages_in", len(packet.messages))
+        is_transaction = len(packet.messages) > 1
+        if is_transaction:
+            self.begin_transaction()
+        try:
+            for timed_msg in packet.messages:
+                for handler in self.handlers_for_address(timed_msg.message.address):
+                    handler.invoke(client_address, timed_msg.message)
+        finally:
+            if is_transaction:
+                self.end_transaction()
+            get_metrics().observe("osc_receive_to_handled", time.monotonic() - start_time)
 
 class OscClient:
     MEC_SERVER_IP = "127.0.0.1"
@@ -330,105 +1373,294 @@ class OscClient:
     OSC_SERVER_IP = "127.0.0.1"
     OSC_SERVER_PORT = 9001
 
+    KEEPALIVE_SECONDS = 5
+    # outgoing /Kontrol/changed messages per second after the first one; kept
+    # above the button autorepeat rate (1 / Controller.AUTOREPEAT_INTERVAL) so
+    # a held button reaches MEC as fast as it moves on the screen
+    CHANGED_MAX_RATE = 20
+    # a publish that goes this long without a message is applied as it is,
+    # in case publishRackFinished never arrives
+    BULK_INGEST_TIMEOUT = 5.0
+    # set ORAC_OSC_CAPTURE to a file path to record all OSC traffic
+    CAPTURE_PATH = os.environ.get("ORAC_OSC_CAPTURE")
+
     dispatcher = None
     osc_server = None
+    osc_transport = None
     osc_client = None
+    changed_output = None
+    echo_suppressor = None
+    keepalive_timer = None
+    bundle_depth = 0
+    bundle_message_list = None
+    transaction_depth = 0
+    bulk_mutation_list = None # model updates buffered while a transaction is open
+    bulk_ingest_timer = None # not None while a publish is being ingested
+    bulk_ingest_rack_count = 0
+    bulk_ingest_last_time = 0.0 # when the publish last delivered a packet
+    bulk_ingest_rack_id_set = None # racks announced or updated by the publish
+    capture = None
 
     def __init__(self):
         self.init_dispatcher()
-        self.osc_server = BlockingOSCUDPServer((self.OSC_SERVER_IP, self.OSC_SERVER_PORT), self.dispatcher)
+        self.osc_server = AsyncIOOSCUDPServer((self.OSC_SERVER_IP, self.OSC_SERVER_PORT), self.dispatcher, get_event_loop())
 
         self.osc_client = SimpleUDPClient(self.MEC_SERVER_IP, self.MEC_SERVER_PORT)
+        self.changed_output = ChangedOutputStage(self, self.CHANGED_MAX_RATE)
+        self.echo_suppressor = EchoSuppressor()
+        get_metrics().add_gauge("changed_output", self.changed_output.get_stats)
+        get_metrics().add_gauge("bulk_mutation_pending", self.get_bulk_mutation_pending)
+        self.dispatcher.packet_listener_list.append(self.handle_packet_in)
+
+    async def start(self):
+        if self.CAPTURE_PATH:
+            self.start_capture(self.CAPTURE_PATH)
+        self.osc_transport, _ = await self.osc_server.create_serve_endpoint()
         self.send_ping(0)
+        self.schedule_keepalive()
 
-    def log(self, log_text):
-        get_logger().log("OscClient", log_text)
-        pass
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("OscClient", log_text, *args, level=level)
+
+    def start_capture(self, path):
+        self.stop_capture()
+        self.capture = OscCapture(path)
+        self.dispatcher.packet_listener_list.append(self.capture.write_packet)
+        self.log("capturing OSC traffic to %s", path, level=LOG_INFO)
+
+    def stop_capture(self):
+        if self.capture is None:
+            return
+        self.dispatcher.packet_listener_list.remove(self.capture.write_packet)
+        self.capture.close()
+        self.log("captured %d packets to %s", self.capture.packet_count, self.capture.path, level=LOG_INFO)
+        self.capture = None
+
+    def schedule_keepalive(self):
+        self.keepalive_timer = get_event_loop().call_later(self.KEEPALIVE_SECONDS - 1, self.handle_keepalive_timer)
+
+    def handle_keepalive_timer(self):
+        self.send_ping(self.KEEPALIVE_SECONDS)
+        self.schedule_keepalive()
+
+    def begin_transaction(self):
+        if self.transaction_depth == 0:
+            self.bulk_mutation_list = []
+            get_controller().disable_update()
+            get_change_bus().begin_batch()
+        self.transaction_depth += 1
+
+    def end_transaction(self):
+        if self.transaction_depth == 0:
+            return
+        self.transaction_depth -= 1
+        if self.transaction_depth > 0:
+            return
+        mutation_list = self.bulk_mutation_list
+        self.bulk_mutation_list = None
+        self.log("apply %d buffered updates", len(mutation_list), level=LOG_INFO)
+        start_time = time.monotonic()
+        with get_render_worker().lock:
+            for mutation, args in mutation_list:
+                try:
+                    self.apply_mutation(mutation, args)
+                except Exception as e:
+                    self.log("failed to apply %s%s: %s", mutation.__name__, args, e, level=LOG_WARNING)
+        get_metrics().observe("model_transaction", time.monotonic() - start_time)
+        # subscribers hear about each changed param, slot or rack once
+        get_change_bus().end_batch()
+        get_controller().enable_update()
+
+    def get_message_rack(self, rack_id):
+        # the rack a /Kontrol message is about; during a publish a rack still
+        # showing older state is reset in the same pass that applies the publish
+        rack = get_rack_registry().get_rack(rack_id)
+        if rack is None:
+            with get_render_worker().lock:
+                rack = get_rack_registry().add_rack(rack_id)
+        if self.bulk_ingest_timer is not None:
+            self.bulk_ingest_rack_id_set.add(rack_id)
+            if rack.is_warm:
+                rack.is_warm = False
+                self.bulk_mutation_list.append((rack.reset, ()))
+        return rack
+
+    def remove_warm_racks(self, keep_rack_id_set):
+        # cached racks MEC did not publish again are gone; a rack the publish
+        # announced or touched stays even when the publish timed out before
+        # its content arrived
+        registry = get_rack_registry()
+        for rack_id in registry.get_rack_ids():
+            if registry.get_rack(rack_id).is_warm and rack_id not in keep_rack_id_set:
+                registry.remove_rack(rack_id)
+
+    def handle_packet_in(self, direction, data):
+        # every packet of a publish pushes its timeout back
+        if direction == PACKET_INBOUND and self.bulk_ingest_timer is not None:
+            self.bulk_ingest_last_time = time.monotonic()
+
+    def begin_bulk_ingest(self, rack_count):
+        if self.bulk_ingest_timer is None:
+            self.begin_transaction()
+            self.bulk_ingest_rack_id_set = set()
+        else:
+            self.bulk_ingest_timer.cancel()
+        self.bulk_ingest_rack_count = rack_count
+        self.bulk_ingest_last_time = time.monotonic()
+        self.bulk_ingest_timer = get_event_loop().call_later(self.BULK_INGEST_TIMEOUT, self.handle_bulk_ingest_timer)
+
+    def handle_bulk_ingest_timer(self):
+        # re-armed for the rest of the idle period instead of on every packet
+        idle_time = time.monotonic() - self.bulk_ingest_last_time
+        if idle_time < self.BULK_INGEST_TIMEOUT:
+            self.bulk_ingest_timer = get_event_loop().call_later(self.BULK_INGEST_TIMEOUT - idle_time, self.handle_bulk_ingest_timer)
+            return
+        self.log("publish timed out after %.1fs without messages, %d racks unfinished",
+                idle_time, self.bulk_ingest_rack_count, level=LOG_WARNING)
+        get_metrics().count("bulk_ingest_timeouts")
+        self.end_bulk_ingest()
+
+    def end_bulk_ingest(self):
+        if self.bulk_ingest_timer is None:
+            return
+        self.bulk_ingest_timer.cancel()
+        self.bulk_ingest_timer = None
+        self.bulk_mutation_list.append((self.remove_warm_racks, (self.bulk_ingest_rack_id_set,)))
+        self.bulk_ingest_rack_id_set = None
+        self.end_transaction()
+
+    def get_bulk_mutation_pending(self):
+        return 0 if self.bulk_mutation_list is None else len(self.bulk_mutation_list)
+
+    def apply_mutation(self, mutation, args):
+        start_time = time.monotonic()
+        mutation(*args)
+        get_metrics().observe("model_mutation", time.monotonic() - start_time)
+
+    def update_model(self, mutation, *args):
+        # the model reports what changed to the change bus subscribers
+        if self.bulk_mutation_list is not None:
+            self.bulk_mutation_list.append((mutation, args))
+            return
+        # the RenderWorker must not read a rack or module halfway through a change
+        with get_render_worker().lock:
+            self.apply_mutation(mutation, args)
 
     def handle_osc_publish(self, address, *args):
         # /Kontrol/publishStart i 1
         # /Kontrol/publishRackFinished s "127.0.0.1:6001"
-        self.log("%s %s" % (address, str(args)))
+        self.log("%s %s", address, args)
         address_path = address.split("/")
         if address_path[-1] == "publishStart":
-            #get_controller().disable_update()
-            pass
+            self.begin_bulk_ingest(args[0] if len(args) > 0 else 1)
         elif address_path[-1] == "publishRackFinished":
-            #get_controller().enable_update()
-            pass
+            self.bulk_ingest_rack_count -= 1
+            if self.bulk_ingest_rack_count <= 0:
+                self.end_bulk_ingest()
+
+    def ingest_page(self, rack, slot_id, page):
+        rack.get_slot_module(slot_id).add_page(page)
+
+    def ingest_param(self, rack, slot_id, param_type, param_id, param_label, param_range, param_default):
+        rack.get_slot_module(slot_id).add_param(param_type, param_id, param_label, param_range, param_default)
+
+    def ingest_changed(self, rack, slot_id, param_id, value):
+        rack.get_slot_module(slot_id).get_param(param_id).set_current(value)
 
     def handle_osc_module(self, address, *args):
         # /Kontrol/module ssss "127.0.0.1:6001" "a1" "Brds Mono" "synth/brdsmono"
-        self.log("%s %s" % (address, str(args)))
-        get_rack().set_module(args[1], Module(args[2], args[3]))
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        self.update_model(self.get_message_rack(args[0]).set_module, args[1], Module(args[2], args[3]))
 
     def handle_osc_page(self, address, *args):
         # /Kontrol/page ssssssss "127.0.0.1:6001" "a1" "pg_osc" "Oscillator" "o_shape" "o_colour" "o_timbre" "o_transpose"
-        self.log("%s %s" % (address, str(args)))
-        get_rack().get_slot_module(args[1]).add_page(ModulePage(args[2], args[3], args[4:]))
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        self.update_model(self.ingest_page, self.get_message_rack(args[0]), args[1], ModulePage(args[2], args[3], args[4:]))
 
     def handle_osc_param(self, address, *args):
         # /Kontrol/param sssssfff "127.0.0.1:6001" "a1" "pct" "o_colour" "Colour" 0.000000 100.000000 50.000000
         # type: pct / freq / time / pitch / int / bool / pan
-        self.log("%s %s" % (address, str(args)))
-        get_rack().get_slot_module(args[1]).add_param(ModuleParam(args[2], args[3], args[4], args[5:-1], args[-1]))
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        self.update_model(self.ingest_param, self.get_message_rack(args[0]), args[1], args[2], args[3], args[4], args[5:-1], args[-1])
+
+    def is_own_echo(self, rack_id, slot_id, param_id, value):
+        # local edits are applied optimistically; echoes of them are dropped
+        # and a different remote value replaces the edits still in flight
+        match = self.echo_suppressor.match(rack_id, slot_id, param_id, value)
+        is_pending = self.changed_output.is_pending(rack_id, slot_id, param_id)
+        if match == ECHO_NONE and not is_pending:
+            return False
+        if match == ECHO_NONE or match == ECHO_CONFLICT:
+            # nothing sent is outstanding when an earlier echo was already
+            # absorbed, but a queued edit would still overwrite the remote value
+            self.changed_output.discard(rack_id, slot_id, param_id)
+            get_metrics().count("changed_echo_conflict")
+            self.log("changed conflict: %s %s %s %f", rack_id, slot_id, param_id, value, level=LOG_INFO)
+            return False
+        if match == ECHO_LATEST and not is_pending:
+            get_metrics().count("changed_echo_absorbed")
+        else:
+            # a newer local value is already queued or in flight
+            get_metrics().count("changed_echo_stale")
+        return True
 
     def handle_osc_changed(self, address, *args):
         # /Kontrol/changed sssf "127.0.0.1:6001" "s1" "r-chout-l-pan-3" 0.000000
-        self.log("%s %s" % (address, str(args)))
-        get_rack().get_slot_module(args[1]).get_param(args[2]).set_current(args[3])
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        if self.is_own_echo(args[0], args[1], args[2], args[3]):
+            return
+        self.update_model(self.ingest_changed, self.get_message_rack(args[0]), args[1], args[2], args[3])
 
     def handle_osc_loadPreset(self, address, *args):
         # /Kontrol/loadPreset ss "127.0.0.1:6001" "demo2"
-        self.log("%s %s" % (address, str(args)))
-        get_rack().set_current_preset(args[1])
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        self.update_model(self.get_message_rack(args[0]).set_current_preset, args[1])
 
     def handle_osc_loadModule(self, address, *args):
         # /Kontrol/loadModule sss "127.0.0.1:6001" "p2" "utility/empty"
-        self.log("%s %s" % (address, str(args)))
+        self.log("%s %s", address, args)
         get_controller().schedule_update()
 
     def handle_osc_resource(self, address, *args):
         # /Kontrol/resource sss "127.0.0.1:6001" "module" "utility/t3dosc"
         # /Kontrol/resource sss "127.0.0.1:6001" "preset" "Init"
         # /Kontrol/resource sss "127.0.0.1:6001" "moduleorder" "a1 a2 a3 b1 b2 b3 b4 c1 c2 c3 p1 p2 m1 m2 m3 s1 s2"
-        self.log("%s %s" % (address, str(args)))
-        get_rack().add_resource_item(args[1], args[2])
-        get_controller().schedule_update()
+        self.log("%s %s", address, args)
+        self.update_model(self.get_message_rack(args[0]).add_resource_item, args[1], args[2])
 
     def handle_osc_midiLearn(self, address, *args):
         # /Kontrol/midiLearn T/F
-        self.log("%s %s" % (address, str(args)))
-        get_rack().set_midi_learn(args[0])
+        self.log("%s %s", address, args)
+        self.update_model(get_rack().set_midi_learn, args[0])
 
     def handle_osc_modLearn(self, address, *args):
         # /Kontrol/modLearn T/F
-        self.log("%s %s" % (address, str(args)))
-        get_rack().set_modulation_learn(args[0])
+        self.log("%s %s", address, args)
+        self.update_model(get_rack().set_modulation_learn, args[0])
 
     def handle_osc_rack(self, address, *args):
         # /Kontrol/rack ssi "127.0.0.1:6001" "127.0.0.1" 6001
-        self.log("%s %s" % (address, str(args)))
-        get_rack().set_id(args[0])
-        get_rack().reset()
-        get_rack_view_state().reset()
-        get_view_manager().reset_all_view_state()
+        self.log("%s %s", address, args)
+        if self.bulk_ingest_timer is not None:
+            self.bulk_ingest_rack_id_set.add(args[0])
+        rack = get_rack_registry().get_rack(args[0])
+        if rack is not None:
+            # a known rack keeps showing its state until the publish replaces it
+            rack.is_warm = True
+            return
+        with get_render_worker().lock:
+            get_rack_registry().add_rack(args[0])
 
     def handle_osc_ping(self, address, *args):
         # /Kontrol/ping ii 6000 0
-        self.log("%s %s" % (address, str(args)))
-        self.send_ping(5)
+        self.log("%s %s", address, args)
+        self.send_ping(self.KEEPALIVE_SECONDS)
 
     def handle_osc_default(self, address, *args):
-        self.log("osc_default: %s %s" % (address, str(args)))
+        self.log("osc_default: %s %s", address, args)
 
     def init_dispatcher(self):
-        self.dispatcher = Dispatcher()
+        self.dispatcher = KontrolDispatcher(self.begin_transaction, self.end_transaction)
         self.dispatcher.map("/Kontrol/publish*", self.handle_osc_publish)
         self.dispatcher.map("/Kontrol/module", self.handle_osc_module)
         self.dispatcher.map("/Kontrol/page", self.handle_osc_page)
@@ -443,48 +1675,292 @@ class OscClient:
         self.dispatcher.map("/Kontrol/ping", self.handle_osc_ping)
         self.dispatcher.set_default_handler(self.handle_osc_default)
 
-    def start_loop(self):
-        self.osc_server.serve_forever()
+    def begin_bundle(self):
+        if self.bundle_depth == 0:
+            self.bundle_message_list = []
+        self.bundle_depth += 1
+
+    def end_bundle(self):
+        if self.bundle_depth == 0:
+            return
+        if self.bundle_depth == 1:
+            # queued parameter changes belong to the bundle as well
+            self.changed_output.flush()
+        self.bundle_depth -= 1
+        if self.bundle_depth > 0:
+            return
+        message_list = self.bundle_message_list
+        self.bundle_message_list = None
+        if len(message_list) == 1:
+            self.send_packet(message_list[0])
+        elif len(message_list) > 1:
+            bundle_builder = OscBundleBuilder(IMMEDIATELY)
+            for msg in message_list:
+                bundle_builder.add_content(msg)
+            self.send_packet(bundle_builder.build())
+
+    def send_packet(self, packet):
+        get_metrics().count("osc_packets_out")
+        for packet_listener in self.dispatcher.packet_listener_list:
+            packet_listener(PACKET_OUTBOUND, packet.dgram)
+        self.osc_client.send(packet)
+
+    def forward_message(self, address, args):
+        # a message from an OscHub client, passed on to MEC as if we sent it
+        if address == "/Kontrol/changed" and len(args) >= 4:
+            # applied here like a remote change, MEC's echo of it is absorbed
+            self.handle_osc_changed(address, *args)
+            self.echo_suppressor.add_sent(args[0], args[1], args[2], args[3])
+        else:
+            self.changed_output.flush()
+        self.send_message(address, args)
+
+    def send_message(self, address, args):
+        message_builder = OscMessageBuilder(address=address)
+        for arg in args:
+            message_builder.add_arg(arg)
+        msg = message_builder.build()
+        if self.bundle_depth > 0:
+            self.bundle_message_list.append(msg)
+        else:
+            self.send_packet(msg)
 
     def send_ping(self, keepalive_seconds):
         # /Kontrol/ping ii 6000 0
         # keepalive_seconds 0 means get current metadata, should be sent only when connection started
-        self.osc_client.send_message("/Kontrol/ping", [self.OSC_SERVER_PORT, keepalive_seconds])
+        self.send_message("/Kontrol/ping", [self.OSC_SERVER_PORT, keepalive_seconds])
 
     def send_changed(self, slot_id, param_id, value):
+        get_tracer().mark("send_changed")
+        self.changed_output.queue(get_rack_id(), slot_id, param_id, value)
+        get_rack_cache().schedule_save()
+
+    def send_changed_now(self, rack_id, slot_id, param_id, value):
         # /Kontrol/changed sssf "127.0.0.1:6001" "s1" "r-chout-l-pan-3" 0.000000
-        self.log("send_changed: %s %s %s %f" % (get_rack_id(), slot_id, param_id, value))
-        self.osc_client.send_message("/Kontrol/changed", [get_rack_id(), slot_id, param_id, value])
+        self.log("send_changed: %s %s %s %f", rack_id, slot_id, param_id, value)
+        self.echo_suppressor.add_sent(rack_id, slot_id, param_id, value)
+        self.send_message("/Kontrol/changed", [rack_id, slot_id, param_id, value])
 
     def send_loadModule(self, slot_id, module_id):
-        self.log("send_loadModule: %s %s %s" % (get_rack_id(), slot_id, module_id))
-        self.osc_client.send_message("/Kontrol/loadModule", [get_rack_id(), slot_id, module_id])
+        # parameter changes must reach MEC before the module is replaced
+        self.changed_output.flush()
+        self.log("send_loadModule: %s %s %s", get_rack_id(), slot_id, module_id, level=LOG_INFO)
+        self.send_message("/Kontrol/loadModule", [get_rack_id(), slot_id, module_id])
        
     def send_loadPreset(self, preset_name):
-        self.log("send_loadPreset: %s %s" % (get_rack_id(), preset_name))
-        self.osc_client.send_message("/Kontrol/loadPreset", [get_rack_id(), preset_name])
+        self.changed_output.flush()
+        self.log("send_loadPreset: %s %s", get_rack_id(), preset_name, level=LOG_INFO)
+        self.send_message("/Kontrol/loadPreset", [get_rack_id(), preset_name])
         get_rack().set_current_preset(preset_name) # MEC_BUG
 
     def send_savePreset(self, preset_name):
-        self.log("send_savePreset: %s %s" % (get_rack_id(), preset_name))
-        self.osc_client.send_message("/Kontrol/savePreset", [get_rack_id(), preset_name])
+        self.changed_output.flush()
+        self.log("send_savePreset: %s %s", get_rack_id(), preset_name, level=LOG_INFO)
+        self.send_message("/Kontrol/savePreset", [get_rack_id(), preset_name])
         get_rack().set_current_preset(preset_name) # MEC_BUG
 
     def send_midiLearn(self, mode):
-        self.log("send_midiLearn: %s" % str(bool(mode)))
-        self.osc_client.send_message("/Kontrol/midiLearn", [bool(mode)])
+        self.log("send_midiLearn: %s", bool(mode), level=LOG_INFO)
+        self.send_message("/Kontrol/midiLearn", [bool(mode)])
         get_rack().set_midi_learn(bool(mode)) # MEC_BUG
 
     def send_modulationLearn(self, mode):
-        self.log("send_modulationLearn: %s" % str(bool(mode)))
-        self.osc_client.send_message("/Kontrol/modulationLearn", [bool(mode)])
+        self.log("send_modulationLearn: %s", bool(mode), level=LOG_INFO)
+        self.send_message("/Kontrol/modulationLearn", [bool(mode)])
         get_rack().set_mod_learn(bool(mode)) # MEC_BUG
 
-osc_client = OscClient()
+osc_client = None
 
 def get_osc_client():
+    global osc_client
+    if osc_client is None:
+        osc_client = OscClient()
     return osc_client
 
+class OscHub:
+    # lets other OSC clients (a web UI, a second controller) share our MEC
+    # session: they ping the hub instead of MEC, get the rack state published
+    # from memory instead of MEC publishing again, receive every message
+    # exchanged with MEC and have their own messages forwarded to MEC.
+    # set ORAC_HUB_PORT to enable it; clients use that port as their MEC port
+    HUB_IP = "127.0.0.1"
+    HUB_PORT = int(os.environ.get("ORAC_HUB_PORT", "0"))
+    # a client that has not pinged for this many keepalive periods is dropped
+    CLIENT_TIMEOUT_FACTOR = 3
+    MIN_CLIENT_TIMEOUT = 15.0
+    # publish bundles are split to stay well inside a UDP datagram and the
+    # receive buffer of small clients
+    MAX_BUNDLE_BYTES = 8000
+
+    dispatcher = None
+    osc_server = None
+    osc_transport = None
+    client_map = None # (ip, port) -> expire time
+    publish_count = 0
+    forward_count = 0
+
+    def __init__(self):
+        self.client_map = {}
+        self.dispatcher = Dispatcher()
+        self.dispatcher.map("/Kontrol/ping", self.handle_osc_ping, needs_reply_address=True)
+        self.dispatcher.set_default_handler(self.handle_osc_forward, needs_reply_address=True)
+        self.osc_server = AsyncIOOSCUDPServer((self.HUB_IP, self.HUB_PORT), self.dispatcher, get_event_loop())
+        get_metrics().add_gauge("hub", self.get_stats)
+
+    async def start(self):
+        self.osc_transport, _ = await self.osc_server.create_serve_endpoint()
+        get_osc_client().dispatcher.packet_listener_list.append(self.relay_packet)
+        self.log("listening on %s:%d", self.HUB_IP, self.HUB_PORT, level=LOG_INFO)
+
+    def stop(self):
+        if self.osc_transport is None:
+            return
+        get_osc_client().dispatcher.packet_listener_list.remove(self.relay_packet)
+        self.osc_transport.close()
+        self.osc_transport = None
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("OscHub", log_text, *args, level=level)
+
+    def get_client_list(self):
+        now = time.monotonic()
+        for client_address, expire_time in list(self.client_map.items()):
+            if expire_time < now:
+                self.log("client %s:%d timed out", *client_address, level=LOG_INFO)
+                del self.client_map[client_address]
+        return list(self.client_map.keys())
+
+    def send_packet(self, data, client_address):
+        # one unreachable client must not stop the others or the MEC handler
+        try:
+            self.osc_transport.sendto(data, client_address)
+        except OSError as e:
+            get_metrics().count("hub_send_errors")
+            self.log("send to %s:%d failed: %s", client_address[0], client_address[1], e, level=LOG_WARNING)
+            return False
+        return True
+
+    def relay_packet(self, direction, data):
+        # keepalives stay between each client and its server
+        if self.osc_transport is None or data.startswith(b"/Kontrol/ping"):
+            return
+        for client_address in self.get_client_list():
+            self.send_packet(data, client_address)
+
+    def handle_osc_ping(self, client_address, address, *args):
+        # /Kontrol/ping ii 9001 0
+        if len(args) == 0 or not isinstance(args[0], int):
+            self.log("ignoring ping without a reply port from %s", client_address[0], level=LOG_WARNING)
+            return
+        client_address = (client_address[0], args[0])
+        keepalive_seconds = args[1] if len(args) > 1 else 0
+        if client_address not in self.client_map:
+            self.log("client %s:%d registered", *client_address, level=LOG_INFO)
+        self.client_map[client_address] = time.monotonic() + max(
+                keepalive_seconds * self.CLIENT_TIMEOUT_FACTOR, self.MIN_CLIENT_TIMEOUT)
+        if keepalive_seconds == 0:
+            self.publish(client_address)
+
+    def handle_osc_forward(self, client_address, address, *args):
+        if not address.startswith("/Kontrol/"):
+            return
+        self.forward_count += 1
+        get_osc_client().forward_message(address, list(args))
+
+    def build_message(self, address, args):
+        message_builder = OscMessageBuilder(address=address)
+        for arg in args:
+            message_builder.add_arg(arg)
+        return message_builder.build()
+
+    def build_bundle(self, message_list):
+        bundle_builder = OscBundleBuilder(IMMEDIATELY)
+        for msg in message_list:
+            bundle_builder.add_content(msg)
+        return bundle_builder.build()
+
+    def build_bundle_list(self, message_list):
+        # "#bundle", time tag, then a size prefix per element
+        bundle_list = []
+        bundle_message_list = []
+        bundle_size = 16
+        for msg in message_list:
+            msg_size = 4 + msg.size
+            if len(bundle_message_list) > 0 and bundle_size + msg_size > self.MAX_BUNDLE_BYTES:
+                bundle_list.append(self.build_bundle(bundle_message_list))
+                bundle_message_list = []
+                bundle_size = 16
+            bundle_message_list.append(msg)
+            bundle_size += msg_size
+        if len(bundle_message_list) > 0:
+            bundle_list.append(self.build_bundle(bundle_message_list))
+        return bundle_list
+
+    def build_rack_packet_list(self, rack):
+        # the publish MEC would send for this rack: bundles for the rack
+        # itself and for each module
+        rack_id = rack.get_id()
+        host, _, port = rack_id.rpartition(":")
+        slot_id_list = [rack.get_slot_id(slot_index) for slot_index in range(rack.get_slot_len())]
+        message_list = [
+                self.build_message("/Kontrol/rack", [rack_id, host, int(port) if port.isdigit() else 0]),
+                self.build_message("/Kontrol/resource", [rack_id, "moduleorder", " ".join(slot_id_list)])
+                ]
+        for res_type in ("module", "preset"):
+            for res in rack.get_resource_list(res_type):
+                message_list.append(self.build_message("/Kontrol/resource", [rack_id, res_type, res]))
+        if rack.get_current_preset() is not None:
+            message_list.append(self.build_message("/Kontrol/loadPreset", [rack_id, rack.get_current_preset()]))
+        packet_list = self.build_bundle_list(message_list)
+        for slot_id in slot_id_list:
+            module = rack.get_slot_module(slot_id)
+            if module is None:
+                continue
+            message_list = [self.build_message("/Kontrol/module", [rack_id, slot_id, module.get_label(), module.get_id()])]
+            for page_index in range(module.get_page_len()):
+                page = module.get_page(page_index)
+                message_list.append(self.build_message("/Kontrol/page",
+                    [rack_id, slot_id, page.get_id(), page.get_label()] + list(page.page_param_order)))
+            param_table = module.get_param_table()
+            for param_index in range(param_table.get_param_len()):
+                param = ModuleParam(param_table, param_index)
+                param_range = [] if param.get_type() == "bool" else [param.get_min(), param.get_max()]
+                message_list.append(self.build_message("/Kontrol/param",
+                    [rack_id, slot_id, param.get_type(), param.get_id(), param.get_label()] + param_range + [param.get_default()]))
+            for param_index in range(param_table.get_param_len()):
+                param = ModuleParam(param_table, param_index)
+                message_list.append(self.build_message("/Kontrol/changed", [rack_id, slot_id, param.get_id(), param.get_current()]))
+            packet_list.extend(self.build_bundle_list(message_list))
+        packet_list.append(self.build_message("/Kontrol/publishRackFinished", [rack_id]))
+        return packet_list
+
+    def publish(self, client_address):
+        registry = get_rack_registry()
+        rack_id_list = registry.get_rack_ids()
+        if not self.send_packet(self.build_message("/Kontrol/publishStart", [len(rack_id_list)]).dgram, client_address):
+            return
+        for rack_id in rack_id_list:
+            for packet in self.build_rack_packet_list(registry.get_rack(rack_id)):
+                if not self.send_packet(packet.dgram, client_address):
+                    return
+        self.publish_count += 1
+        self.log("published %d racks to %s:%d", len(rack_id_list), *client_address, level=LOG_INFO)
+
+    def get_stats(self):
+        return {
+                "clients": len(self.client_map),
+                "publishes": self.publish_count,
+                "forwarded": self.forward_count
+                }
+
+osc_hub = None
+
+def get_osc_hub():
+    global osc_hub
+    if osc_hub is None:
+        osc_hub = OscHub()
+    return osc_hub
+
 class Rect:
     x = 0
     y = 0
@@ -504,6 +1980,7 @@ class Color:
     r = 0
     g = 0
     b = 0
+    rgb565 = None
 
     def __init__(self, r, g, b):
         self.r = r
@@ -513,6 +1990,11 @@ class Color:
     def to_tuple(self):
         return (self.r, self.g, self.b)
 
+    def to_rgb565(self):
+        if self.rgb565 is None:
+            self.rgb565 = ((self.r & 0xF8) << 8) | ((self.g & 0xFC) << 3) | (self.b >> 3)
+        return self.rgb565
+
     def get_inversion(self):
         return Color(255 - self.r, 255 - self.g, 255 - self.b)
 
@@ -535,13 +2017,194 @@ ALIGN_LEFT = 0
 ALIGN_CENTER = 1
 ALIGN_RIGHT = 2
 
+def rgb888_to_rgb565(rgb):
+    rgb = rgb.astype(np.uint16)
+    return ((rgb[..., 0] & 0xF8) << 8) | ((rgb[..., 1] & 0xFC) << 3) | (rgb[..., 2] >> 3)
+
+class TextBitmapCache:
+    # rendered text masks keyed by (text, font); a mask is colour independent so
+    # one entry serves every colour the text is drawn in
+    max_bytes = 0
+    cache_bytes = 0
+    hit_count = 0
+    miss_count = 0
+    bitmap_map = None
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bitmap_map = collections.OrderedDict()
+
+    def get_bitmap(self, text, font, draw):
+        key = (text, font)
+        bitmap = self.bitmap_map.get(key)
+        if bitmap is not None:
+            self.hit_count += 1
+            self.bitmap_map.move_to_end(key)
+            return bitmap
+        self.miss_count += 1
+        size = draw.textsize(text, font)
+        mask = Image.new("L", size)
+        ImageDraw.Draw(mask).text((0, 0), text, font=font, fill=255)
+        bitmap = (mask, size)
+        self.bitmap_map[key] = bitmap
+        self.cache_bytes += size[0] * size[1]
+        while self.cache_bytes > self.max_bytes and len(self.bitmap_map) > 1:
+            _, (_, evicted_size) = self.bitmap_map.popitem(last=False)
+            self.cache_bytes -= evicted_size[0] * evicted_size[1]
+        return bitmap
+
+    def get_stats(self):
+        return {
+                "hit": self.hit_count,
+                "miss": self.miss_count,
+                "entries": len(self.bitmap_map),
+                "bytes": self.cache_bytes
+                }
+
+MIRROR_MAGIC = b"ORFM"
+MIRROR_HEADER_FORMAT = ">4sBHHI" # magic, kind, y0 / width, y1 / height, payload length
+MIRROR_HELLO = 0 # frame size, sent once per connection
+MIRROR_ROWS = 1 # zlib-compressed big-endian RGB565 scanlines [y0, y1)
+MIRROR_FRAME = 2 # the rows sent before it form a complete frame
+
+class FrameMirror:
+    # streams what the panel shows to clients of a Unix socket
+    # (tools/mirror_client.py). The render thread copies changed rows into a
+    # working frame and publishes them all at once at the end of the frame,
+    # flagging them per client; each client thread compresses and sends the
+    # rows flagged since its last send from the published frame, so it never
+    # sends half a frame and a slow client skips intermediate frames instead
+    # of queueing them
+    ZLIB_LEVEL = 1
+
+    path = None
+    frame = None # last complete frame, shared with the client threads
+    pending_frame = None # frame being drawn, render thread only
+    pending_rows = None
+    condition = None
+    client_list = None
+    server_socket = None
+    is_running = False
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.frame = np.zeros((height, width), dtype=np.uint16)
+        self.pending_frame = np.zeros((height, width), dtype=np.uint16)
+        self.pending_rows = np.zeros(height, dtype=bool)
+        self.condition = threading.Condition()
+        self.client_list = []
+        get_metrics().add_gauge("mirror_clients", lambda: len(self.client_list))
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("FrameMirror", log_text, *args, level=level)
+
+    def start(self):
+        try:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server_socket.bind(self.path)
+            self.server_socket.listen(2)
+        except OSError as e:
+            self.log("cannot listen on %s: %s", self.path, e, level=LOG_WARNING)
+            return
+        self.is_running = True
+        threading.Thread(target=self.run_accept, name="FrameMirror", daemon=True).start()
+        self.log("mirroring the screen on %s", self.path, level=LOG_INFO)
+
+    def stop(self):
+        if not self.is_running:
+            return
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        self.server_socket.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def update_rows(self, y0, y1, frame_span):
+        # render thread: must stay a plain copy
+        self.pending_frame[y0:y1] = frame_span
+        self.pending_rows[y0:y1] = True
+
+    def end_frame(self):
+        if not self.pending_rows.any():
+            return
+        with self.condition:
+            self.frame[self.pending_rows] = self.pending_frame[self.pending_rows]
+            for dirty_rows in self.client_list:
+                dirty_rows |= self.pending_rows
+            self.condition.notify_all()
+        self.pending_rows[:] = False
+
+    def run_accept(self):
+        while self.is_running:
+            try:
+                client_socket, _ = self.server_socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.run_client, args=(client_socket,), name="FrameMirrorClient", daemon=True).start()
+
+    def run_client(self, client_socket):
+        height, width = self.frame.shape
+        # a new client starts with the whole frame
+        dirty_rows = np.ones(height, dtype=bool)
+        with self.condition:
+            self.client_list.append(dirty_rows)
+        self.log("client connected", level=LOG_INFO)
+        try:
+            client_socket.sendall(struct.pack(MIRROR_HEADER_FORMAT, MIRROR_MAGIC, MIRROR_HELLO, width, height, 0))
+            while True:
+                with self.condition:
+                    while self.is_running and not dirty_rows.any():
+                        self.condition.wait()
+                    if not self.is_running:
+                        break
+                    row_index_list = np.flatnonzero(dirty_rows)
+                    dirty_rows[:] = False
+                    span_list = []
+                    for span in np.split(row_index_list, np.flatnonzero(np.diff(row_index_list) > 1) + 1):
+                        y0, y1 = int(span[0]), int(span[-1]) + 1
+                        span_list.append((y0, y1, self.frame[y0:y1].astype(">u2").tobytes()))
+                # compress outside the lock, the render thread never waits for it
+                packet_list = []
+                for y0, y1, data in span_list:
+                    payload = zlib.compress(data, self.ZLIB_LEVEL)
+                    packet_list.append(struct.pack(MIRROR_HEADER_FORMAT, MIRROR_MAGIC, MIRROR_ROWS, y0, y1, len(payload)))
+                    packet_list.append(payload)
+                packet_list.append(struct.pack(MIRROR_HEADER_FORMAT, MIRROR_MAGIC, MIRROR_FRAME, 0, 0, 0))
+                data = b"".join(packet_list)
+                client_socket.sendall(data)
+                get_metrics().count("mirror_bytes", len(data))
+        except OSError as e:
+            self.log("client gone: %s", e, level=LOG_INFO)
+        finally:
+            with self.condition:
+                self.client_list.remove(dirty_rows)
+            client_socket.close()
+
 class Screen:
+    DISPLAY_ROTATION = 90
+    FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    CONDENSED_FONT_PATH = "/usr/share/fonts/truetype/piboto/PibotoCondensed-Bold.ttf"
+    TEXT_CACHE_MAX_BYTES = 1024 * 1024
+    # changed scanlines closer than this are pushed in a single window
+    WINDOW_MERGE_GAP = 4
+    # set ORAC_MIRROR_SOCKET to a socket path to stream the screen to tools/mirror_client.py
+    MIRROR_PATH = os.environ.get("ORAC_MIRROR_SOCKET")
+
     disp = None
     img = None
     draw = None
     font = None
     condensed_font = None
     disp_rect = None
+    text_cache = None
+    dirty_rect_list = None
+    panel_frame = None # RGB565 copy of what the panel currently shows
+    frame_mirror = None
 
     def __init__(self):
         self.disp = ST7789(
@@ -549,15 +2212,25 @@ class Screen:
             cs=1,
             dc=9,
             backlight=13,
+            rotation=self.DISPLAY_ROTATION,
             spi_speed_hz=80 * 1000 * 1000
         )
         self.disp.begin()
 
+        self.init_framebuffer()
+        self.font = ImageFont.truetype(self.FONT_PATH, 20)
+        self.condensed_font = ImageFont.truetype(self.CONDENSED_FONT_PATH, 20)
+        self.disp_rect = Rect(0, 0, self.disp.width, self.disp.height)
+        self.text_cache = TextBitmapCache(self.TEXT_CACHE_MAX_BYTES)
+        get_metrics().add_gauge("text_cache", self.text_cache.get_stats)
+        self.dirty_rect_list = []
+        if self.MIRROR_PATH:
+            self.frame_mirror = FrameMirror(self.MIRROR_PATH, self.disp_rect.w, self.disp_rect.h)
+            self.frame_mirror.start()
+
+    def init_framebuffer(self):
         self.img = Image.new('RGB', (self.disp.width, self.disp.height), color=Color_BLACK.to_tuple())
         self.draw = ImageDraw.Draw(self.img)
-        self.font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-        self.condensed_font = ImageFont.truetype("/usr/share/fonts/truetype/piboto/PibotoCondensed-Bold.ttf", 20)
-        self.disp_rect = Rect(0, 0, self.disp.width, self.disp.height)
 
     def clear(self):
         self.draw_rect(self.disp_rect, Color_BLACK)
@@ -571,11 +2244,10 @@ class Screen:
     def get_row_rect(self, row_index):
         return Rect(0, 30 + row_index * self.get_row_height(), self.disp.width, self.get_row_height())
 
-    def draw_text_in_rect(self, text, rect, color, alignment=ALIGN_CENTER, font=None):
-        if font is None:
-            font = self.font
-        size_x, size_y = self.draw.textsize(text, font)
+    def mark_dirty(self, rect):
+        self.dirty_rect_list.append(rect)
 
+    def get_text_origin(self, rect, size_x, size_y, alignment):
         if alignment == ALIGN_CENTER:
             text_x = rect.x + (rect.w - size_x) // 2
         elif alignment == ALIGN_LEFT:
@@ -583,22 +2255,156 @@ class Screen:
         elif alignment == ALIGN_RIGHT:
             text_x = rect.x + (rect.w - size_x)
         text_y = rect.y + (rect.h - size_y) // 2
-        self.draw.text((text_x, text_y), text, font=font, fill=color.to_tuple())
+        return text_x, text_y
+
+    def get_bar_width(self, pct, rect):
+        # remote values can lie outside the param range
+        return max(0, min(int(rect.w * pct / 100.0), rect.w))
+
+    def draw_text_in_rect(self, text, rect, color, alignment=ALIGN_CENTER, font=None):
+        if font is None:
+            font = self.font
+        mask, (size_x, size_y) = self.text_cache.get_bitmap(text, font, self.draw)
+
+        text_x, text_y = self.get_text_origin(rect, size_x, size_y, alignment)
+        if size_x > 0 and size_y > 0:
+            self.img.paste(color.to_tuple(), (text_x, text_y), mask)
+        self.mark_dirty(rect)
 
     def draw_rect(self, rect, color):
-        self.draw.rectangle(rect.to_tuple(), color.to_tuple())
+        # rows tile the screen exactly, so a row can be redrawn without
+        # touching its neighbours
+        if rect.w > 0 and rect.h > 0:
+            self.draw.rectangle((rect.x, rect.y, rect.x + rect.w - 1, rect.y + rect.h - 1), color.to_tuple())
+        self.mark_dirty(rect)
 
     def draw_bar(self, pct, rect, fg_color, bg_color):
         self.draw_rect(rect, bg_color)
-        bar_rect = Rect(rect.x, rect.y, int(rect.w * pct / 100.0), rect.h)
+        bar_w = self.get_bar_width(pct, rect)
+        bar_rect = Rect(rect.x, rect.y, bar_w, rect.h)
         self.draw_rect(bar_rect, fg_color)
 
+    def pop_dirty_spans(self):
+        height = self.disp_rect.h
+        span_list = sorted((max(0, r.y), min(height, r.y + r.h)) for r in self.dirty_rect_list)
+        self.dirty_rect_list = []
+        merged_span_list = []
+        for y0, y1 in span_list:
+            if y0 >= y1:
+                continue
+            if len(merged_span_list) > 0 and y0 <= merged_span_list[-1][1]:
+                merged_span_list[-1][1] = max(merged_span_list[-1][1], y1)
+            else:
+                merged_span_list.append([y0, y1])
+        return merged_span_list
+
+    def get_frame_span(self, y0, y1):
+        return rgb888_to_rgb565(np.asarray(self.img.crop((0, y0, self.disp_rect.w, y1))))
+
+    def display_window(self, y0, y1, frame_span):
+        # map screen scanlines [y0, y1) to the panel window the rotation puts them in
+        width = self.disp_rect.w
+        height = self.disp_rect.h
+        k = self.DISPLAY_ROTATION // 90
+        if k == 0:
+            window = (0, y0, width - 1, y1 - 1)
+        elif k == 1:
+            window = (y0, 0, y1 - 1, width - 1)
+        elif k == 2:
+            window = (0, height - y1, width - 1, height - 1 - y0)
+        else:
+            window = (height - y1, 0, height - 1 - y0, width - 1)
+        pixel_data = np.rot90(frame_span, k).astype(">u2").tobytes()
+        self.disp.set_window(*window)
+        self.disp.data(list(pixel_data))
+        get_metrics().count("spi_windows")
+        get_metrics().count("spi_bytes", len(pixel_data))
+        if self.frame_mirror is not None:
+            self.frame_mirror.update_rows(y0, y1, frame_span)
+
     def update(self):
-        self.disp.display(self.img)
+        dirty_span_list = self.pop_dirty_spans()
+        if self.panel_frame is None:
+            # panel content is unknown until the first full transfer
+            self.panel_frame = self.get_frame_span(0, self.disp_rect.h).copy()
+            self.display_window(0, self.disp_rect.h, self.panel_frame)
+        else:
+            self.update_changed_rows(dirty_span_list)
+        if self.frame_mirror is not None:
+            self.frame_mirror.end_frame()
+
+    def update_changed_rows(self, dirty_span_list):
+        for y0, y1 in dirty_span_list:
+            frame_span = self.get_frame_span(y0, y1)
+            changed_rows = np.flatnonzero(np.any(frame_span != self.panel_frame[y0:y1], axis=1))
+            if len(changed_rows) == 0:
+                continue
+            window_start = changed_rows[0]
+            window_end = changed_rows[0] + 1
+            for row in changed_rows[1:]:
+                if row - window_end > self.WINDOW_MERGE_GAP:
+                    self.display_window(y0 + window_start, y0 + window_end, frame_span[window_start:window_end])
+                    window_start = row
+                window_end = row + 1
+            self.display_window(y0 + window_start, y0 + window_end, frame_span[window_start:window_end])
+            self.panel_frame[y0:y1] = frame_span
+
+class Rgb565Screen(Screen):
+    # keeps the frame in the panel's native RGB565 format so rects and bars are
+    # plain slice fills and update() needs no per-frame colour conversion;
+    # only text masks still come from PIL
+    fb = None
+
+    def init_framebuffer(self):
+        self.fb = np.zeros((self.disp.height, self.disp.width), dtype=np.uint16)
+        # text metrics only
+        self.draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+
+    def draw_text_in_rect(self, text, rect, color, alignment=ALIGN_CENTER, font=None):
+        if font is None:
+            font = self.font
+        mask, (size_x, size_y) = self.text_cache.get_bitmap(text, font, self.draw)
+
+        text_x, text_y = self.get_text_origin(rect, size_x, size_y, alignment)
+        self.blend_mask(mask, text_x, text_y, color)
+        self.mark_dirty(rect)
+
+    def blend_mask(self, mask, x, y, color):
+        height, width = self.fb.shape
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + mask.size[0], width)
+        y1 = min(y + mask.size[1], height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        alpha = np.asarray(mask)[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.uint32)
+        region = self.fb[y0:y1, x0:x1].astype(np.uint32)
+        inv_alpha = 255 - alpha
+        r = (color.r * alpha + ((region >> 8) & 0xF8) * inv_alpha) // 255
+        g = (color.g * alpha + ((region >> 3) & 0xFC) * inv_alpha) // 255
+        b = (color.b * alpha + ((region << 3) & 0xF8) * inv_alpha) // 255
+        self.fb[y0:y1, x0:x1] = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
+    def draw_rect(self, rect, color):
+        self.fb[max(rect.y, 0):rect.y + rect.h, max(rect.x, 0):rect.x + rect.w] = color.to_rgb565()
+        self.mark_dirty(rect)
 
-screen = Screen()
+    def draw_bar(self, pct, rect, fg_color, bg_color):
+        self.draw_rect(rect, bg_color)
+        bar_w = self.get_bar_width(pct, rect)
+        self.fb[max(rect.y, 0):rect.y + rect.h, max(rect.x, 0):rect.x + bar_w] = fg_color.to_rgb565()
+
+    def get_frame_span(self, y0, y1):
+        return self.fb[y0:y1]
+
+USE_RGB565_FRAMEBUFFER = True
+
+screen = None
 
 def get_screen():
+    global screen
+    if screen is None:
+        screen = Rgb565Screen() if USE_RGB565_FRAMEBUFFER else Screen()
     return screen
 
 class BaseField:
@@ -606,20 +2412,36 @@ class BaseField:
     row_rect = None
     is_focused = False
     perform_hint = "--------"
+    render_key = None # state the row was last drawn with, None forces a redraw
 
     def __init__(self, row_index):
         self.row_index = row_index
         self.row_rect = get_screen().get_row_rect(self.row_index)
         self.is_focused = False
 
-    def log(self, log_text):
-        get_logger().log(self.__class__.__name__, log_text)
-        pass
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log(self.__class__.__name__, log_text, *args, level=level)
 
     def render(self):
         self.log("render")
         get_screen().draw_rect(self.row_rect, Color_BLACK)
 
+    def get_render_key(self):
+        # cheap summary of everything render() draws; None redraws every frame
+        return None
+
+    def render_if_changed(self):
+        render_key = self.get_render_key()
+        if render_key is not None and render_key == self.render_key:
+            get_metrics().count("fields_skipped")
+            return
+        self.render()
+        self.render_key = render_key
+        get_metrics().count("fields_drawn")
+
+    def reset_render_key(self):
+        self.render_key = None
+
     def draw_arrows(self):
         color = Color_DARKGRAY if self.is_focused else Color_LIGHTGRAY
         get_screen().draw_text_in_rect("<", self.row_rect, color, alignment=ALIGN_LEFT)
@@ -645,14 +2467,19 @@ class ItemSelectField(BaseField):
         super().__init__(row_index)
         self.item_select_view = res_select_view
 
+    def get_text(self):
+        view_offset = self.item_select_view.view_offset
+        if self.row_index < self.item_select_view.get_item_len() - view_offset:
+            return self.item_select_view.get_item(view_offset + self.row_index)
+        return ""
+
+    def get_render_key(self):
+        return (self.is_focused, self.get_text())
+
     def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
-        view_offset = self.item_select_view.view_offset
-        item_len = self.item_select_view.get_item_len()
-        text = ""
-        if self.row_index < item_len - view_offset:
-            text = self.item_select_view.get_item(view_offset + self.row_index)
-        self.log("render item_len=%d view_offset=%d row_index=%d text=%s" % (item_len, view_offset, self.row_index, text))
+        text = self.get_text()
+        self.log("render view_offset=%d row_index=%d text=%s", self.item_select_view.view_offset, self.row_index, text)
         get_screen().draw_text_in_rect(text, self.row_rect, Color_BLACK if self.is_focused else Color_WHITE, font=get_screen().condensed_font)
 
     def select_item(self):
@@ -664,14 +2491,58 @@ class ItemSelectField(BaseField):
     def perform_increase(self, offset_level):
         self.select_item()
 
-class MenuModuleField(BaseField):
-    perform_hint = "SELECT MODULE"
+class MenuRackField(BaseField):
+    perform_hint = "SELECT RACK"
+
+    def get_render_key(self):
+        return (self.is_focused, get_rack_id(), len(get_rack_registry().get_rack_ids()))
+
     def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
-        module_label = "Empty"
+        rack_id = get_rack_id()
+        text_color = Color_BLACK if self.is_focused else Color_WHITE
+        font = get_screen().condensed_font
+        label_text = "Rack (%d)" % len(get_rack_registry().get_rack_ids())
+        get_screen().draw_text_in_rect(label_text, self.row_rect, text_color, alignment=ALIGN_LEFT, font=font)
+        value_text = "[ %s ]" % (rack_id if rack_id is not None else "N/A")
+        get_screen().draw_text_in_rect(value_text, self.row_rect, text_color, alignment=ALIGN_RIGHT, font=font)
+
+    def on_item_selected(self, selected_item_index):
+        rack_id_list = get_rack_registry().get_rack_ids()
+        if 0 <= selected_item_index < len(rack_id_list):
+            # the model and view position of every rack are kept, switching needs no republish
+            get_rack_registry().set_active_rack_id(rack_id_list[selected_item_index])
+            get_view_manager().reset_rack_view_state()
+        get_view_manager().pop_modal_view()
+
+    def open_item_select_view(self):
+        rack_id_list = get_rack_registry().get_rack_ids()
+        if len(rack_id_list) == 0:
+            return
+        item_select_view = ItemSelectView(rack_id_list, get_rack_id(), self.on_item_selected)
+        get_view_manager().push_modal_view(item_select_view)
+
+    def perform_decrease(self, offset_level):
+        self.open_item_select_view()
+
+    def perform_increase(self, offset_level):
+        self.open_item_select_view()
+
+class MenuModuleField(BaseField):
+    perform_hint = "SELECT MODULE"
+
+    def get_module_label(self):
         active_slot_module = get_rack_view_state().get_active_slot_module()
         if active_slot_module is not None:
-            module_label = active_slot_module.get_label()
+            return active_slot_module.get_label()
+        return "Empty"
+
+    def get_render_key(self):
+        return (self.is_focused, get_rack_view_state().get_active_slot_id(), self.get_module_label())
+
+    def render(self):
+        get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
+        module_label = self.get_module_label()
         text_color = Color_BLACK if self.is_focused else Color_WHITE
         label_font = get_screen().condensed_font
         label_text = "Module (%s)" % get_rack_view_state().get_active_slot_id()
@@ -680,10 +2551,8 @@ class MenuModuleField(BaseField):
         value_text = "[ %s ]" % module_label
         get_screen().draw_text_in_rect(value_text, self.row_rect, text_color, alignment=ALIGN_RIGHT, font=value_font)
 
-    def on_item_selected(self, selected_item_index):
-        res_type = "module"
-        selected_item = get_rack().get_resource_list(res_type)[selected_item_index]
-        get_osc_client().send_loadModule(get_rack_view_state().get_active_slot_id(), selected_item)
+    def on_resource_selected(self, resource):
+        get_osc_client().send_loadModule(get_rack_view_state().get_active_slot_id(), resource)
         get_view_manager().pop_modal_view()
 
     def open_item_select_view(self):
@@ -693,7 +2562,7 @@ class MenuModuleField(BaseField):
             current_item = active_slot_module.get_id()
         if current_item is None:
             return
-        item_select_view = ItemSelectView(get_rack().get_resource_list("module"), current_item, self.on_item_selected)
+        item_select_view = ResourceTreeSelectView(get_rack().get_module_resource_tree(), current_item, self.on_resource_selected)
         get_view_manager().push_modal_view(item_select_view)
 
     def perform_decrease(self, offset_level):
@@ -706,6 +2575,9 @@ class MenuPresetField(BaseField):
     perform_hint = "SELECT PRESET"
     item_select_view_prepend_item_list = [ "(Save Preset)", "(New Preset)" ]
 
+    def get_render_key(self):
+        return (self.is_focused, get_rack().get_current_preset())
+
     def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
         preset_name = "(N/A)"
@@ -754,6 +2626,9 @@ class MenuToggleField(BaseField):
         self.value_getter = value_getter
         self.value_setter = value_setter
 
+    def get_render_key(self):
+        return (self.is_focused, bool(self.value_getter()))
+
     def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
         text_color = Color_BLACK if self.is_focused else Color_WHITE
@@ -777,6 +2652,9 @@ class MenuSaveSettingsField(BaseField):
     perform_hint = "EXECUTE"
     show_saved = False
 
+    def get_render_key(self):
+        return (self.is_focused, self.show_saved)
+
     def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
         text = "SAVED!" if self.show_saved else "[ Save Settings ]"
@@ -799,16 +2677,21 @@ class DeviceShutdownField(BaseField):
     perform_hint = "EXECUTE"
     show_confirm = False
 
-    def render(self):
-        # FIXME(wangpy): place unset of show_confirm to a better place
-        if not self.is_focused:
+    def set_focused(self, is_focused):
+        super().set_focused(is_focused)
+        if not is_focused:
             self.show_confirm = False
+
+    def get_render_key(self):
+        return (self.is_focused, self.show_confirm)
+
+    def render(self):
         get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
         text = "PRESS B TO CONFIRM" if self.show_confirm else "[ Shutdown ]"
         get_screen().draw_text_in_rect(text, self.row_rect, Color_BLACK if self.is_focused else Color_WHITE)
 
     def confirm_shutdown(self, is_decrease_button_pressed):
-        self.log("confirm_shutdown show_confirm=%d decrease_pressed=%d" % (self.show_confirm, is_decrease_button_pressed))
+        self.log("confirm_shutdown show_confirm=%d decrease_pressed=%d", self.show_confirm, is_decrease_button_pressed, level=LOG_INFO)
         if self.show_confirm:
             if is_decrease_button_pressed:
                 os.system("/usr/bin/sudo /usr/sbin/shutdown -h now")
@@ -830,12 +2713,18 @@ class DeviceNetworkIpField(BaseField):
         super().__init__(row_index)
         self.interface_id = interface_id
 
-    def render(self):
-        label = "%s IP:" % self.interface_id
-        network_ip = "N/A"
+    def get_network_ip(self):
         network_interface = ni.ifaddresses(self.interface_id)
         if network_interface is not None and ni.AF_INET in network_interface:
-            network_ip = network_interface[ni.AF_INET][0]['addr']
+            return network_interface[ni.AF_INET][0]['addr']
+        return "N/A"
+
+    def get_render_key(self):
+        return (self.is_focused, self.get_network_ip())
+
+    def render(self):
+        label = "%s IP:" % self.interface_id
+        network_ip = self.get_network_ip()
 
         bg_color = Color_WHITE if self.is_focused else Color_BLACK
         get_screen().draw_rect(self.row_rect, bg_color)
@@ -866,6 +2755,17 @@ class StaticTextField(BaseField):
         self.font = font
         self.is_rand_color = is_rand_color
 
+    def get_center_text(self):
+        if callable(self.center_text):
+            return self.center_text()
+        return self.center_text
+
+    def get_render_key(self):
+        # random backgrounds change on every frame
+        if self.is_rand_color:
+            return None
+        return (self.is_focused, self.get_center_text())
+
     def render(self):
         bg_color = Color_WHITE if self.is_focused else Color_BLACK
         if self.is_rand_color:
@@ -880,9 +2780,7 @@ class StaticTextField(BaseField):
         font = get_screen().font
         if self.font is not None:
             font = self.font
-        center_text = self.center_text
-        if callable(center_text):
-            center_text = self.center_text()
+        center_text = self.get_center_text()
         get_screen().draw_text_in_rect(center_text, self.row_rect, text_color, font=font)
 
         if self.left_text is not None:
@@ -896,14 +2794,20 @@ class RackSlotField(BaseField):
     def __init__(self, row_index):
         super().__init__(row_index)
 
-    def render(self):
-        get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
+    def get_text(self):
         slot_label = "Empty"
         slot_module = get_rack_view_state().get_active_slot_module()
         if slot_module is not None:
             slot_label = slot_module.get_label()
-        text = "%s: %s" % (get_rack_view_state().get_active_slot_id(), slot_label)
-        self.log("render text="+text)
+        return "%s: %s" % (get_rack_view_state().get_active_slot_id(), slot_label)
+
+    def get_render_key(self):
+        return (self.is_focused, self.get_text())
+
+    def render(self):
+        get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
+        text = self.get_text()
+        self.log("render text=%s", text)
         get_screen().draw_text_in_rect(text, self.row_rect, Color_BLACK if self.is_focused else Color_WHITE)
         self.draw_arrows()
 
@@ -920,14 +2824,19 @@ class RackSlotPageField(BaseField):
     def __init__(self, row_index):
         super().__init__(row_index)
 
-    def render(self):
-        get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
-        page_label = "-"
+    def get_text(self):
         active_page = get_rack_view_state().get_active_slot_module_page()
         if active_page is not None:
-            page_label = active_page.get_label()
-        text = page_label
-        self.log("render module=%s text=%s" % (get_rack_view_state().get_active_slot_id(), text))
+            return active_page.get_label()
+        return "-"
+
+    def get_render_key(self):
+        return (self.is_focused, self.get_text())
+
+    def render(self):
+        get_screen().draw_rect(self.row_rect, Color_WHITE if self.is_focused else Color_BLACK)
+        text = self.get_text()
+        self.log("render module=%s text=%s", get_rack_view_state().get_active_slot_id(), text)
         get_screen().draw_text_in_rect(text, self.row_rect, Color_BLACK if self.is_focused else Color_WHITE)
         self.draw_arrows()
 
@@ -947,6 +2856,12 @@ class RackSlotPageParamField(BaseField):
         super().__init__(row_index)
         self.page_param_index = page_param_index
 
+    def get_render_key(self):
+        module_param = get_rack_view_state().get_active_slot_module_page_param(self.page_param_index)
+        if module_param is None:
+            return (self.is_focused, None)
+        return (self.is_focused, module_param.get_label(), module_param.get_current_str(), module_param.get_current_pct())
+
     def render(self):
         module_param = get_rack_view_state().get_active_slot_module_page_param(self.page_param_index)
         if module_param is not None:
@@ -955,7 +2870,7 @@ class RackSlotPageParamField(BaseField):
             get_screen().draw_bar(module_param.get_current_pct(), self.row_rect, fg_color, bg_color)
             label = module_param.get_label()
             value = module_param.get_current_str()
-            self.log("render label=%s, value=%s" % (label, value))
+            self.log("render label=%s, value=%s", label, value)
             color = Color_BLACK if self.is_focused else Color_WHITE
             get_screen().draw_text_in_rect("%s" % label, self.row_rect, color, alignment=ALIGN_LEFT)
             get_screen().draw_text_in_rect("%s" % value, self.row_rect, color, alignment=ALIGN_RIGHT)
@@ -995,8 +2910,8 @@ class BaseView:
     def reset_view_state(self):
         self.set_active_field_index(0)
 
-    def log(self, log_text):
-        get_logger().log(self.__class__.__name__, log_text)
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log(self.__class__.__name__, log_text, *args, level=level)
 
     def create_field_for_row(self, row_index):
         return BaseField(row_index)
@@ -1025,15 +2940,28 @@ class BaseView:
 
     def render(self):
         self.log("render")
-        get_screen().clear()
+        # every field paints its whole row, so only rows that really changed reach the panel
         for i in range(get_screen().get_row_count()):
-            self.field_list[i].render()
+            self.field_list[i].render_if_changed()
         self.render_header_and_footer()
-        get_screen().update()
+
+    def render_fields(self, field_list):
+        for field in field_list:
+            field.render_if_changed()
+
+    def reset_render_keys(self):
+        # another view has drawn over the rows since this one last rendered
+        for field in self.field_list:
+            field.reset_render_key()
+        self.header_field.reset_render_key()
+        self.footer_field.reset_render_key()
+
+    def get_param_field(self, slot_id, param_id):
+        return None
 
     def render_header_and_footer(self):
-        self.header_field.render()
-        self.footer_field.render()
+        self.header_field.render_if_changed()
+        self.footer_field.render_if_changed()
 
     def move_cursor_to_previous(self):
         self.active_field_index = (self.active_field_index + self.get_row_count() - 1) % self.get_row_count()
@@ -1051,6 +2979,10 @@ class BaseView:
         self.move_cursor_to_next()
         self.get_active_field().set_focused(True)
 
+    def get_offset_level(self, pressed_counter):
+        # pressed_counter is 1 for the press and grows with each autorepeat tick
+        return pressed_counter // 10
+
     def perform_decrease(self, offset_level=0):
         self.get_active_field().perform_decrease(offset_level)
 
@@ -1058,6 +2990,24 @@ class BaseView:
         self.get_active_field().perform_increase(offset_level)
 
 class RackSlotPageParamView(BaseView):
+    # (slot_id, param_id) -> field showing it, rebuilt when slot or page changes
+    param_field_map = None
+    param_field_map_key = None
+
+    def get_param_field(self, slot_id, param_id):
+        active_slot_id = get_rack_view_state().get_active_slot_id()
+        active_page = get_rack_view_state().get_active_slot_module_page()
+        param_field_map_key = (active_slot_id, active_page)
+        if param_field_map_key != self.param_field_map_key:
+            self.param_field_map_key = param_field_map_key
+            self.param_field_map = {}
+            if active_page is not None:
+                for field in self.field_list[2:]:
+                    page_param_id = active_page.get_param_id(field.page_param_index)
+                    if page_param_id is not None:
+                        self.param_field_map[(active_slot_id, page_param_id)] = field
+        return self.param_field_map.get((slot_id, param_id))
+
     def create_field_for_row(self, row_index):
         if row_index == 0:
             return RackSlotField(row_index)
@@ -1076,15 +3026,15 @@ class RackSlotPageParamView(BaseView):
 class MenuView(BaseView):
     def create_field_for_row(self, row_index):
         if row_index == 0:
-            return StaticTextField(row_index, "===== MENU =====")
+            return MenuRackField(row_index)
         if row_index == 1:
             return MenuModuleField(row_index)
         elif row_index == 2:
             return MenuPresetField(row_index)
         elif row_index == 3:
-            return MenuToggleField(row_index, "Midi Learn", get_rack().get_midi_learn, get_osc_client().send_midiLearn)
+            return MenuToggleField(row_index, "Midi Learn", lambda: get_rack().get_midi_learn(), get_osc_client().send_midiLearn)
         elif row_index == 4:
-            return MenuToggleField(row_index, "Mod Learn", get_rack().get_modulation_learn, get_osc_client().send_modulationLearn)
+            return MenuToggleField(row_index, "Mod Learn", lambda: get_rack().get_modulation_learn(), get_osc_client().send_modulationLearn)
         elif row_index == 5:
             return MenuSaveSettingsField(row_index)
         else:
@@ -1113,6 +3063,14 @@ class DeviceView(BaseView):
 
 class ItemSelectView(BaseView):
     header_text = "SELECT (A+X: EXIT)"
+    # B / Y moves the cursor a row per tap; while held it moves a page after
+    # a few autorepeat ticks, then a whole run of the jump table (category or
+    # first letter)
+    PAGE_REPEAT_COUNT = 3
+    JUMP_REPEAT_COUNT = 6
+    PAGE_OFFSET_LEVEL = 1
+    JUMP_OFFSET_LEVEL = 2
+
     prepend_item_list = None
     item_list = None
     item_selected_callback = None
@@ -1120,7 +3078,7 @@ class ItemSelectView(BaseView):
 
     def __init__(self, item_list, current_item, item_selected_callback, prepend_item_list=None):
         super().__init__()
-        self.item_list = item_list
+        self.item_list = item_list if isinstance(item_list, ResourceList) else ResourceList(item_list)
         if prepend_item_list is not None:
             self.prepend_item_list = prepend_item_list
         if current_item in self.item_list:
@@ -1135,29 +3093,66 @@ class ItemSelectView(BaseView):
         item_len = self.get_item_len()
         return 6 if item_len > 6 else item_len
 
-    def move_cursor_to_previous(self):
-        if self.active_field_index > 0:
-            self.active_field_index -= 1
-        elif self.view_offset > 0:
-            self.view_offset -= 1
+    def get_cursor_index(self):
+        # position in the prepended items followed by the item list
+        return self.view_offset + self.active_field_index
 
-    def move_cursor_to_next(self):
-        row_count = self.get_row_count()
+    def set_cursor_index(self, cursor_index):
         item_len = self.get_item_len()
-        if self.active_field_index < row_count - 1:
-            self.active_field_index += 1
-        elif self.view_offset < item_len - row_count:
-            self.view_offset += 1
+        if item_len == 0:
+            return
+        cursor_index = max(0, min(cursor_index, item_len - 1))
+        row_count = self.get_row_count()
+        if cursor_index < self.view_offset:
+            self.view_offset = cursor_index
+        elif cursor_index >= self.view_offset + row_count:
+            self.view_offset = cursor_index - (row_count - 1)
+        self.set_active_field_index(cursor_index - self.view_offset)
+
+    def get_jump_cursor_index(self, direction):
+        cursor_index = self.get_cursor_index()
+        prepend_item_len = self.get_prepend_item_len()
+        item_index = cursor_index - prepend_item_len
+        if direction > 0:
+            jump_index = 0 if item_index < 0 else self.get_item_list().get_next_jump_index(item_index)
+        else:
+            if item_index <= 0:
+                return 0
+            jump_index = self.get_item_list().get_previous_jump_index(item_index)
+        if jump_index is None:
+            return cursor_index
+        return jump_index + prepend_item_len
+
+    def get_offset_level(self, pressed_counter):
+        # lists are long, page and jump sooner than a param speeds up
+        repeat_count = pressed_counter - 1
+        if repeat_count >= self.JUMP_REPEAT_COUNT:
+            return self.JUMP_OFFSET_LEVEL
+        if repeat_count >= self.PAGE_REPEAT_COUNT:
+            return self.PAGE_OFFSET_LEVEL
+        return 0
+
+    def move_cursor(self, direction, offset_level):
+        if offset_level >= self.JUMP_OFFSET_LEVEL:
+            cursor_index = self.get_jump_cursor_index(direction)
+        elif offset_level >= self.PAGE_OFFSET_LEVEL:
+            cursor_index = self.get_cursor_index() + direction * self.get_row_count()
+        else:
+            cursor_index = self.get_cursor_index() + direction
+        self.set_cursor_index(cursor_index)
 
     def get_prepend_item_len(self):
         if self.prepend_item_list is not None:
             return len(self.prepend_item_list)
         return 0
 
+    def get_item_list(self):
+        return self.item_list
+
     def get_item_len(self):
         item_len = self.get_prepend_item_len()
-        if self.item_list is not None:
-            item_len += len(self.item_list)
+        if self.get_item_list() is not None:
+            item_len += len(self.get_item_list())
         return item_len
     
     def get_item(self, item_index):
@@ -1165,16 +3160,11 @@ class ItemSelectView(BaseView):
         if item_index < prepend_item_len:
             return self.prepend_item_list[item_index]
         elif item_index < self.get_item_len():
-            return self.item_list[item_index - prepend_item_len]
+            return self.get_item_list()[item_index - prepend_item_len]
         return None
 
     def set_focused_item(self, item_index):
-        active_field_index = item_index + self.get_prepend_item_len()
-        row_count = self.get_row_count()
-        if item_index >= row_count:
-            active_field_index = row_count - 1
-            self.view_offset = item_index - (row_count - 1)
-        self.set_active_field_index(active_field_index)
+        self.set_cursor_index(item_index + self.get_prepend_item_len())
 
     def item_selected(self, selected_row_index):
         selected_item_index = self.view_offset + selected_row_index - self.get_prepend_item_len()
@@ -1187,10 +3177,56 @@ class ItemSelectView(BaseView):
         super().perform_increase()
 
     def perform_decrease(self, offset_level=0):
-        super().perform_previous()
+        self.move_cursor(-1, offset_level)
 
     def perform_increase(self, offset_level=0):
-        super().perform_next()
+        self.move_cursor(1, offset_level)
+
+class ResourceTreeSelectView(ItemSelectView):
+    # browses a ResourceTree one category at a time, starting in the category
+    # of the current resource; a category's list is built when first opened
+    back_item_list = [ "(Back)" ]
+    node = None
+    resource_selected_callback = None
+
+    def __init__(self, resource_tree, current_resource, resource_selected_callback):
+        current_node = resource_tree.get_node(current_resource) if current_resource is not None else None
+        self.node = resource_tree.get_root() if current_node is None else current_node.parent
+        self.resource_selected_callback = resource_selected_callback
+        current_label = None if current_node is None else current_node.get_entry_label(False)
+        super().__init__(self.node.get_entry_label_list(), current_label, self.on_item_selected, self.get_back_item_list())
+
+    def get_back_item_list(self):
+        return None if self.node.parent is None else self.back_item_list
+
+    def get_item_list(self):
+        # children may arrive while the view is open
+        return self.node.get_entry_label_list()
+
+    def get_header_text(self):
+        if self.node.parent is None:
+            return self.header_text
+        return "%s/ (A+X: EXIT)" % self.node.path
+
+    def open_node(self, node, focused_label=None):
+        self.node = node
+        self.prepend_item_list = self.get_back_item_list()
+        self.view_offset = 0
+        label_list = self.get_item_list()
+        if focused_label in label_list:
+            self.set_focused_item(label_list.index(focused_label))
+        else:
+            self.set_focused_item(0)
+
+    def on_item_selected(self, selected_item_index):
+        if selected_item_index < 0:
+            self.open_node(self.node.parent, self.node.get_entry_label(True))
+            return
+        child, is_category = self.node.get_entry(selected_item_index)
+        if is_category:
+            self.open_node(child)
+        else:
+            self.resource_selected_callback(child.resource)
 
 class ViewManager:
     view_list = None
@@ -1203,15 +3239,19 @@ class ViewManager:
         self.view_list.append(MenuView())
         self.view_list.append(DeviceView())
 
-    def log(self, log_text):
-        get_logger().log("ViewManager", log_text)
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("ViewManager", log_text, *args, level=level)
 
     def reset_view_state(self):
-        if self.active_model_view is not None:
-            self.active_model_view.reset_view_state()
         for view in self.view_list:
             view.reset_view_state()
 
+    def reset_rack_view_state(self):
+        # cursor positions in the rack view do not carry over to another rack
+        for view in self.view_list:
+            if isinstance(view, RackSlotPageParamView):
+                view.reset_view_state()
+
     def get_active_view(self):
         if self.has_active_modal_view():
             return self.modal_view_stack[-1]
@@ -1220,10 +3260,10 @@ class ViewManager:
     def pop_or_toggle_active_view(self):
         if self.has_active_modal_view():
             popped_view = self.modal_view_stack.pop()
-            self.log("pop modal view %s" % popped_view.__class__.__name__)
+            self.log("pop modal view %s", popped_view.__class__.__name__, level=LOG_INFO)
         else:
             self.active_view_index = (self.active_view_index + 1) % len(self.view_list)
-            self.log("pop_or_toggle_active_view active_view_index=%d" % self.active_view_index)
+            self.log("pop_or_toggle_active_view active_view_index=%d", self.active_view_index, level=LOG_INFO)
 
     def has_active_modal_view(self):
         return len(self.modal_view_stack) > 0
@@ -1235,42 +3275,194 @@ class ViewManager:
         if self.has_active_modal_view():
             self.pop_or_toggle_active_view()
 
-view_manager = ViewManager()
+view_manager = None
+
 def get_view_manager():
+    global view_manager
+    if view_manager is None:
+        view_manager = ViewManager()
     return view_manager
 
 def get_active_view():
     return get_view_manager().get_active_view()
 
+class RenderWorker:
+    # the only thread that touches the Screen; invalidate() may be called from
+    # any thread and requests arriving while a frame is pending are coalesced
+    MAX_FPS = 30
+
+    min_frame_interval = 0.0
+    condition = None
+    lock = None
+    thread = None
+    is_invalidated = False
+    invalidated_field_set = None
+    pause_count = 0
+    last_frame_time = 0.0
+    invalidate_count = 0
+    frame_count = 0
+    frame_time_list = None # end times of the recent frames, for the fps gauge
+    rendered_view = None # view shown on the screen
+
+    def __init__(self, max_fps=MAX_FPS):
+        self.set_max_fps(max_fps)
+        self.condition = threading.Condition()
+        self.invalidated_field_set = set()
+        self.frame_time_list = collections.deque(maxlen=2 * max_fps)
+        get_metrics().add_gauge("render", self.get_stats)
+        # held while rendering; take it to mutate view state from other threads
+        self.lock = threading.RLock()
+        self.thread = threading.Thread(target=self.run, name="RenderWorker", daemon=True)
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("RenderWorker", log_text, *args, level=level)
+
+    def set_max_fps(self, max_fps):
+        self.min_frame_interval = 1.0 / max_fps
+
+    def start(self):
+        self.thread.start()
+
+    def invalidate(self):
+        with self.condition:
+            self.invalidate_count += 1
+            self.is_invalidated = True
+            self.condition.notify()
+
+    def invalidate_field(self, field):
+        with self.condition:
+            self.invalidate_count += 1
+            self.invalidated_field_set.add(field)
+            self.condition.notify()
+
+    def pause(self):
+        with self.condition:
+            self.pause_count += 1
+
+    def resume(self):
+        with self.condition:
+            if self.pause_count == 0:
+                return
+            self.pause_count -= 1
+            self.condition.notify()
+
+    def wait_for_frame(self):
+        with self.condition:
+            while (not self.is_invalidated and len(self.invalidated_field_set) == 0) or self.pause_count > 0:
+                self.condition.wait()
+        # invalidations arriving during this wait are folded into the same frame
+        wait_time = self.last_frame_time + self.min_frame_interval - time.monotonic()
+        if wait_time > 0:
+            time.sleep(wait_time)
+        with self.condition:
+            field_set = None if self.is_invalidated else self.invalidated_field_set
+            self.is_invalidated = False
+            self.invalidated_field_set = set()
+        return field_set
+
+    def run(self):
+        while True:
+            field_set = self.wait_for_frame()
+            with self.lock:
+                start_time = time.monotonic()
+                # every trace submitted so far has its changes in this frame
+                trace_list = get_tracer().take_pending()
+                view = get_active_view()
+                if view is not self.rendered_view:
+                    view.reset_render_keys()
+                    self.rendered_view = view
+                    field_set = None
+                if field_set is not None and field_set.issubset(view.field_list):
+                    view.render_fields(field_set)
+                    get_metrics().count("frames_partial")
+                else:
+                    view.render()
+                    get_metrics().count("frames_full")
+                render_end_time = time.monotonic()
+            # the frame is complete in the framebuffer; pushing it over SPI only
+            # touches the Screen, so model updates need not wait for it
+            get_screen().update()
+            self.last_frame_time = time.monotonic()
+            get_metrics().observe("render", render_end_time - start_time)
+            get_metrics().observe("screen_update", self.last_frame_time - render_end_time)
+            if len(trace_list) > 0:
+                get_tracer().complete(trace_list, start_time, render_end_time, self.last_frame_time)
+            self.frame_time_list.append(self.last_frame_time)
+            self.frame_count += 1
+
+    def get_fps(self):
+        now = time.monotonic()
+        return sum(1 for frame_time in list(self.frame_time_list) if now - frame_time <= 1.0)
+
+    def get_stats(self):
+        with self.condition:
+            pending_field_count = len(self.invalidated_field_set)
+        return {
+                "fps": self.get_fps(),
+                "frames": self.frame_count,
+                "invalidations": self.invalidate_count,
+                "coalesced": self.invalidate_count - self.frame_count,
+                "pending_fields": pending_field_count,
+                "paused": self.pause_count > 0
+                }
+
+render_worker = RenderWorker()
+
+def get_render_worker():
+    return render_worker
+
 class Controller:
     BUTTONS = [5, 6, 16, 24]
     LABELS = ['A', 'B', 'X', 'Y']
+    AUTOREPEAT_DELAY = 0.3
+    AUTOREPEAT_INTERVAL = 0.1
     pressed_button = 0
     pressed_counter = 0
-    disable_update_count = 0
     consume_button_up_counter = 0
     update_callback = None
+    update_timer = None
 
     def __init__(self):
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(self.BUTTONS, GPIO.IN, pull_up_down=GPIO.PUD_UP)
         for pin in self.BUTTONS:
-            GPIO.add_event_detect(pin, GPIO.BOTH, self.handle_button, bouncetime=20)
-
-        signal.signal(signal.SIGHUP, self.sigalrm_handler)
-        signal.signal(signal.SIGINT, self.sigint_handler)
-        signal.signal(signal.SIGTERM, self.sigint_handler)
-        signal.signal(signal.SIGALRM, self.sigalrm_handler)
-
-    def log(self, log_text):
-        get_logger().log("Controller", log_text)
-
-    def handle_button(self, pin):
+            GPIO.add_event_detect(pin, GPIO.BOTH, self.handle_gpio_edge, bouncetime=20)
+        get_change_bus().subscribe(CHANGE_KIND_LIST, self.handle_model_change)
+
+    def start(self):
+        loop = get_event_loop()
+        loop.add_signal_handler(signal.SIGHUP, self.handle_hangup)
+        loop.add_signal_handler(signal.SIGINT, self.shutdown)
+        loop.add_signal_handler(signal.SIGTERM, self.shutdown)
+        loop.add_signal_handler(signal.SIGUSR1, get_logger().dump_ring_buffer)
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("Controller", log_text, *args, level=level)
+
+    def handle_gpio_edge(self, pin):
+        # runs on the RPi.GPIO callback thread; sample the level now and
+        # handle the edge on the event loop
+        edge_time = time.monotonic()
         state = GPIO.input(pin)
-        if state == 0: # FALLING
-            self.handle_button_down(pin)
-        else: # RISING
-            self.handle_button_up(pin)
+        get_event_loop().call_soon_threadsafe(self.handle_button_state, pin, state, edge_time)
+
+    def handle_button(self, pin, is_repeat=False):
+        self.handle_button_state(pin, GPIO.input(pin), time.monotonic(), is_repeat)
+
+    def handle_button_state(self, pin, state, event_time=None, is_repeat=False):
+        get_tracer().begin("repeat" if is_repeat else "edge",
+                self.LABELS[self.BUTTONS.index(pin)] + ("-" if state == 0 else "+"),
+                time.monotonic() if event_time is None else event_time)
+        try:
+            with get_render_worker().lock:
+                if state == 0: # FALLING
+                    self.handle_button_down(pin)
+                else: # RISING
+                    self.handle_button_up(pin)
+        finally:
+            get_tracer().end()
+        # keeps the slot / page position for the next start
+        get_rack_cache().schedule_save()
 
     def handle_button_down(self, pin):
         if (self.pressed_button == 5 and pin == 16 or
@@ -1286,10 +3478,10 @@ class Controller:
         else:
             self.pressed_button = pin
             self.pressed_counter = 1
-        offset_level = self.pressed_counter // 10
+        offset_level = get_active_view().get_offset_level(self.pressed_counter)
 
         label = self.LABELS[self.BUTTONS.index(pin)]
-        self.log("button_down button=%s counter=%d" % (label, self.pressed_counter))
+        self.log("button_down button=%s counter=%d", label, self.pressed_counter)
         if label == 'B':
             self.run_update_callback()
             get_active_view().perform_decrease(offset_level)
@@ -1302,9 +3494,9 @@ class Controller:
             return
 
         if self.pressed_counter > 1:
-            self.set_update_timer(0.1)
+            self.set_update_timer(self.AUTOREPEAT_INTERVAL)
         else:
-            self.set_update_timer(0.3)
+            self.set_update_timer(self.AUTOREPEAT_DELAY)
 
     def handle_button_up(self, pin):
         if self.pressed_button == pin:
@@ -1317,7 +3509,7 @@ class Controller:
             return
 
         label = self.LABELS[self.BUTTONS.index(pin)]
-        self.log("button_up button=%s counter=%d" % (label, self.pressed_counter))
+        self.log("button_up button=%s counter=%d", label, self.pressed_counter)
         if label == 'A':
             self.run_update_callback()
             get_active_view().perform_previous()
@@ -1327,17 +3519,21 @@ class Controller:
             get_active_view().perform_next()
             self.update_screen()
 
-    def sigint_handler(self, signum, frame):
-        get_screen().clear()
-        get_screen().update()
-        sys.exit(0)
+    def shutdown(self):
+        get_event_loop().stop()
+
+    def handle_hangup(self):
+        # run the timer early; the pending one must not fire a second repeat
+        self.set_update_timer(0)
+        self.handle_update_timer()
 
-    def sigalrm_handler(self, signum, frame):
-        self.log("SIGALRM")
+    def handle_update_timer(self):
+        self.update_timer = None
+        self.log("update timer")
         #self.log("Rack: " + json.dumps(get_rack().to_obj(), indent=4))
         self.run_update_callback()
         if self.pressed_button > 0:
-            self.handle_button(self.pressed_button)
+            self.handle_button(self.pressed_button, True)
 
     def set_update_callback(self, cb):
         self.update_callback = cb
@@ -1348,39 +3544,136 @@ class Controller:
             self.update_callback = None
 
     def update_screen(self):
-        get_active_view().render()
-        
+        get_tracer().submit()
+        get_render_worker().invalidate()
+
     def disable_update(self):
-        self.disable_update_count += 1
-        self.enable_or_disable_update_timer()
+        get_render_worker().pause()
 
     def enable_update(self):
-        if self.disable_update_count == 0:
-            return
-        self.disable_update_count -= 1
-        self.enable_or_disable_update_timer()
+        get_render_worker().resume()
 
     def schedule_update(self):
-        self.set_update_callback(self.update_screen)
-        self.enable_or_disable_update_timer()
+        get_render_worker().invalidate()
 
-    def enable_or_disable_update_timer(self):
-        if self.disable_update_count == 0:
-            self.set_update_timer(0.1)
+    def handle_model_change(self, change):
+        if change.kind == CHANGE_RACK_LIST:
+            self.schedule_update()
+        elif change.rack_id != get_rack_id():
+            # racks in the background are not on the screen
+            pass
+        elif change.kind == CHANGE_PARAM:
+            # only the row showing the param (if any) needs a redraw
+            self.schedule_param_update(change.slot_id, change.param_id)
         else:
-            self.set_update_timer(0)
+            self.schedule_update()
+
+    def schedule_param_update(self, slot_id, param_id):
+        field = get_active_view().get_param_field(slot_id, param_id)
+        if field is not None:
+            get_render_worker().invalidate_field(field)
 
     def set_update_timer(self, timer):
-        signal.setitimer(signal.ITIMER_REAL, timer)
+        if self.update_timer is not None:
+            self.update_timer.cancel()
+            self.update_timer = None
+        if timer > 0:
+            self.update_timer = get_event_loop().call_later(timer, self.handle_update_timer)
 
-controller = Controller()
+controller = None
 
 def get_controller():
+    global controller
+    if controller is None:
+        controller = Controller()
     return controller
 
+class StatsServer:
+    # local query interface: connect to the Unix socket, send "stats" (the
+    # default, JSON) or "log" (the log ring buffer) and read until EOF, e.g.
+    # echo stats | nc -U /tmp/pirate-audio-orac.sock
+    SOCKET_PATH = "/tmp/pirate-audio-orac.sock"
+    READ_TIMEOUT = 1.0
+
+    server = None
+
+    def log(self, log_text, *args, level=LOG_DEBUG):
+        get_logger().log("StatsServer", log_text, *args, level=level)
+
+    async def start(self):
+        try:
+            if os.path.exists(self.SOCKET_PATH):
+                os.unlink(self.SOCKET_PATH)
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=self.SOCKET_PATH)
+        except OSError as e:
+            self.log("cannot listen on %s: %s", self.SOCKET_PATH, e, level=LOG_WARNING)
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.server.close()
+        self.server = None
+        try:
+            os.unlink(self.SOCKET_PATH)
+        except OSError:
+            pass
+
+    def get_reply(self, command):
+        if command == "stats":
+            return json.dumps(get_metrics().get_stats(), indent=1, sort_keys=True) + "\n"
+        if command == "log":
+            return "\n".join(get_logger().get_ring_buffer_lines()) + "\n"
+        return "unknown command: %s\n" % command
+
+    async def handle_connection(self, reader, writer):
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.READ_TIMEOUT)
+        except asyncio.TimeoutError:
+            line = b""
+        command = line.decode("utf-8", "replace").strip() or "stats"
+        self.log("query: %s", command)
+        try:
+            writer.write(self.get_reply(command).encode("utf-8"))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+stats_server = StatsServer()
+
+def get_stats_server():
+    return stats_server
 
 def main():
+    loop = get_event_loop()
+    asyncio.set_event_loop(loop)
+    get_rack_cache().load()
+    get_rack_cache().start()
+    get_screen()
+    get_view_manager()
+    get_osc_client()
+    get_render_worker().start()
+    get_controller().start()
+    loop.run_until_complete(get_osc_client().start())
+    loop.run_until_complete(get_stats_server().start())
+    if OscHub.HUB_PORT > 0:
+        loop.run_until_complete(get_osc_hub().start())
     get_controller().update_screen()
-    get_osc_client().start_loop()
-
-main()
+    try:
+        loop.run_forever()
+    finally:
+        if osc_hub is not None:
+            osc_hub.stop()
+        if get_screen().frame_mirror is not None:
+            get_screen().frame_mirror.stop()
+        get_stats_server().stop()
+        get_osc_client().stop_capture()
+        get_tracer().close()
+        get_rack_cache().save()
+        with get_render_worker().lock:
+            get_screen().clear()
+            get_screen().update()
+
+if __name__ == "__main__":
+    main()
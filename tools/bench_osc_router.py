@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Measures how fast incoming /Kontrol packets are routed to their handlers
+# with python-osc's generic Dispatcher ("before") and KontrolDispatcher ("after").
+#
+#   python3 tools/bench_osc_router.py [message_count]
+
+from pythonosc.dispatcher import Dispatcher
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+import sys
+import time
+
+import fake_hardware
+from orac_app import load_app
+
+ADDRESS_LIST = [
+        "/Kontrol/publish*",
+        "/Kontrol/module",
+        "/Kontrol/page",
+        "/Kontrol/param",
+        "/Kontrol/changed",
+        "/Kontrol/loadPreset",
+        "/Kontrol/loadModule",
+        "/Kontrol/resource",
+        "/Kontrol/midiLearn",
+        "/Kontrol/modLearn",
+        "/Kontrol/rack",
+        "/Kontrol/ping"
+        ]
+
+handled_count = 0
+
+def handle_message(address, *args):
+    global handled_count
+    handled_count += 1
+
+def build_packet(address, args):
+    message_builder = OscMessageBuilder(address=address)
+    for arg in args:
+        message_builder.add_arg(arg)
+    return message_builder.build().dgram
+
+def build_packet_list(message_count):
+    # mostly modulation floods, with the odd publish message mixed in
+    packet_list = []
+    for i in range(message_count):
+        if i % 50 == 0:
+            packet_list.append(build_packet("/Kontrol/publishRackFinished", ["127.0.0.1:6001"]))
+        elif i % 10 == 0:
+            packet_list.append(build_packet("/Kontrol/param", ["127.0.0.1:6001", "a1", "pct", "p%d" % i, "P", 0.0, 100.0, 50.0]))
+        else:
+            packet_list.append(build_packet("/Kontrol/changed", ["127.0.0.1:6001", "a1", "o_colour", float(i % 100)]))
+    return packet_list
+
+def init_dispatcher(dispatcher):
+    for address in ADDRESS_LIST:
+        dispatcher.map(address, handle_message)
+    dispatcher.set_default_handler(handle_message)
+    return dispatcher
+
+def run(label, dispatcher, packet_list, message_list):
+    global handled_count
+    handled_count = 0
+    start_time = time.perf_counter()
+    for packet in packet_list:
+        dispatcher.call_handlers_for_packet(packet, ("127.0.0.1", 6000))
+    packet_time = time.perf_counter() - start_time
+    assert handled_count == len(packet_list)
+
+    start_time = time.perf_counter()
+    for address in message_list:
+        for handler in dispatcher.handlers_for_address(address):
+            pass
+    route_time = time.perf_counter() - start_time
+    print("%-10s packets: %10.0f msg/s   routing only: %10.0f msg/s" % (
+        label, len(packet_list) / packet_time, len(message_list) / route_time))
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # the controller script imports the display and GPIO drivers
+    fake_hardware.install()
+    app = load_app()
+    packet_list = build_packet_list(message_count)
+    message_list = ["/Kontrol/changed"] * message_count
+    run("before", init_dispatcher(Dispatcher()), packet_list, message_list)
+    run("after", init_dispatcher(app.KontrolDispatcher(lambda: None, lambda: None)), packet_list, message_list)
+
+if __name__ == "__main__":
+    main()
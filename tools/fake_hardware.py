@@ -0,0 +1,130 @@
+# In-memory stand-ins for the Pirate Audio hardware modules (ST7789 and
+# RPi.GPIO) so the controller can run on any Linux box. install() must be
+# called before the controller script is loaded; load_fake_app() does both.
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+import types
+
+from orac_app import load_app
+
+class FakeST7789:
+    # display sink: accepts the same calls as the ST7789 driver and only
+    # counts what would have crossed the SPI bus
+    def __init__(self, port, cs, dc, backlight=None, rst=None, width=240,
+            height=240, rotation=90, invert=True, spi_speed_hz=4000000):
+        self._width = width
+        self._height = height
+        self._rotation = rotation
+        self.window_count = 0
+        self.byte_count = 0
+
+    @property
+    def width(self):
+        return self._width if self._rotation == 0 or self._rotation == 180 else self._height
+
+    @property
+    def height(self):
+        return self._height if self._rotation == 0 or self._rotation == 180 else self._width
+
+    def begin(self):
+        pass
+
+    def set_window(self, x0=0, y0=0, x1=None, y1=None):
+        self.window_count += 1
+
+    def data(self, data):
+        self.byte_count += len(data)
+
+    def display(self, image):
+        self.set_window()
+        self.data(bytes(self._width * self._height * 2))
+
+class FakeGPIO:
+    # scripted button source; press() / release() behave like an edge on a
+    # pulled-up button
+    BCM = 11
+    IN = 1
+    OUT = 0
+    PUD_UP = 22
+    BOTH = 33
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pin_state_map = {}
+        self.callback_map = {}
+        self.edge_time_list = []
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pins, mode, pull_up_down=None):
+        pass
+
+    def output(self, pin, value):
+        pass
+
+    def input(self, pin):
+        return self.pin_state_map.get(pin, self.HIGH)
+
+    def add_event_detect(self, pin, edge, callback, bouncetime=0):
+        self.callback_map[pin] = callback
+
+    def set_pin(self, pin, state):
+        with self.lock:
+            self.pin_state_map[pin] = state
+            callback = self.callback_map.get(pin)
+        if callback is not None:
+            callback(pin)
+
+    def press(self, pin):
+        self.edge_time_list.append(time.monotonic())
+        self.set_pin(pin, self.LOW)
+
+    def release(self, pin):
+        self.set_pin(pin, self.HIGH)
+
+fake_gpio = FakeGPIO()
+
+def install():
+    st7789_module = types.ModuleType("ST7789")
+    st7789_module.ST7789 = FakeST7789
+    sys.modules["ST7789"] = st7789_module
+
+    gpio_module = types.ModuleType("RPi.GPIO")
+    for name in dir(fake_gpio):
+        if not name.startswith("_"):
+            setattr(gpio_module, name, getattr(fake_gpio, name))
+    rpi_module = types.ModuleType("RPi")
+    rpi_module.GPIO = gpio_module
+    sys.modules["RPi"] = rpi_module
+    sys.modules["RPi.GPIO"] = gpio_module
+
+    if importlib.util.find_spec("netifaces") is None:
+        netifaces_module = types.ModuleType("netifaces")
+        netifaces_module.AF_INET = 2
+        netifaces_module.ifaddresses = lambda interface_id: {}
+        sys.modules["netifaces"] = netifaces_module
+    return fake_gpio
+
+def load_fake_app(cache_dir, mec_port, osc_port, mirror=False):
+    # loads the controller on fake hardware with its own ports and rack cache
+    # so it can run next to a real instance
+    install()
+    app = load_app()
+    app.RackCache.CACHE_PATH = os.path.join(cache_dir, "rack.cache")
+    app.OscClient.MEC_SERVER_PORT = mec_port
+    app.OscClient.OSC_SERVER_PORT = osc_port
+    app.StatsServer.SOCKET_PATH = os.path.join(cache_dir, "stats.sock")
+    app.Screen.MIRROR_PATH = os.path.join(cache_dir, "mirror.sock") if mirror else None
+    if not os.path.exists(app.Screen.CONDENSED_FONT_PATH):
+        app.Screen.CONDENSED_FONT_PATH = app.Screen.FONT_PATH
+    return app
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# Runs the whole controller against fake hardware and a local MEC stand-in,
+# then reports OSC throughput, frame rate, SPI bytes and button-to-frame
+# latency:
+#
+#   python3 tools/load_harness.py --slots 8 --flood 20000 --rate 4000 --presses 50
+
+import argparse
+import tempfile
+import threading
+import time
+
+import fake_hardware
+import orac_stats
+from mec_simulator import MecSimulator
+
+PIN_X = 16
+PIN_Y = 24
+
+def percentile(value_list, pct):
+    if len(value_list) == 0:
+        return 0.0
+    ordered = sorted(value_list)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class LoadHarness:
+    def __init__(self, args):
+        self.args = args
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = fake_hardware.load_fake_app(self.cache_dir.name, args.mec_port, args.osc_port)
+        self.gpio = fake_hardware.fake_gpio
+        self.mec = MecSimulator(args.slots, args.pages, args.params, args.mec_port, args.echo, args.racks)
+        self.osc_message_count = 0
+        self.frame_list = [] # (start, end) of each Screen.update()
+        self.handled_press_list = [] # (edge time, handled time) of each Y press
+        self.phase_list = []
+
+    def setup(self):
+        app = self.app
+        app.get_logger().set_level(app.LOG_WARNING)
+
+        screen = app.get_screen()
+        update = screen.update
+        def timed_update():
+            start_time = time.monotonic()
+            update()
+            self.frame_list.append((start_time, time.monotonic()))
+        screen.update = timed_update
+
+        dispatcher = app.get_osc_client().dispatcher
+        call_handlers_for_packet = dispatcher.call_handlers_for_packet
+        def counted_call_handlers_for_packet(data, client_address):
+            self.osc_message_count += data.count(b"/Kontrol/")
+            call_handlers_for_packet(data, client_address)
+        dispatcher.call_handlers_for_packet = counted_call_handlers_for_packet
+
+        controller = app.get_controller()
+        handle_button_state = controller.handle_button_state
+        def timed_handle_button_state(pin, state, *args):
+            handle_button_state(pin, state, *args)
+            is_repeat = len(args) > 1 and args[1]
+            if pin == PIN_Y and state == 0 and not is_repeat:
+                self.handled_press_list.append((self.gpio.edge_time_list[-1], time.monotonic()))
+        controller.handle_button_state = timed_handle_button_state
+
+    def begin_phase(self, name):
+        worker = self.app.get_render_worker()
+        self.phase_list.append((name, time.monotonic(), self.osc_message_count,
+            worker.frame_count, self.get_spi_bytes()))
+
+    def get_spi_bytes(self):
+        return self.app.get_screen().disp.byte_count
+
+    def tap(self, pin, hold_seconds=0.02):
+        self.gpio.press(pin)
+        time.sleep(hold_seconds)
+        self.gpio.release(pin)
+
+    def run_scenario(self):
+        args = self.args
+        try:
+            self.begin_phase("publish")
+            if not self.mec.published.wait(30):
+                print("publish did not arrive")
+                return
+            time.sleep(0.5)
+
+            self.begin_phase("flood")
+            self.mec.flood(args.flood, args.rate)
+            time.sleep(0.5)
+
+            self.begin_phase("presses")
+            self.tap(PIN_X)
+            time.sleep(0.1)
+            self.tap(PIN_X)
+            time.sleep(0.1)
+            for _ in range(args.presses):
+                self.tap(PIN_Y)
+                time.sleep(args.press_interval)
+            if args.hold > 0:
+                # autorepeat ticks
+                self.tap(PIN_Y, args.hold)
+            time.sleep(0.5)
+            self.begin_phase("end")
+            if args.stats:
+                print(orac_stats.query("stats", self.app.StatsServer.SOCKET_PATH), end="")
+        finally:
+            loop = self.app.get_event_loop()
+            loop.call_soon_threadsafe(loop.stop)
+
+    def run(self):
+        self.setup()
+        self.mec.start()
+        threading.Thread(target=self.run_scenario, name="LoadHarness", daemon=True).start()
+        try:
+            self.app.main()
+        finally:
+            self.mec.stop()
+            self.cache_dir.cleanup()
+        self.report()
+
+    def get_press_latency_list(self):
+        latency_list = []
+        for edge_time, handled_time in self.handled_press_list:
+            # the first frame that started after the press was applied shows it
+            for start_time, end_time in self.frame_list:
+                if start_time >= handled_time:
+                    latency_list.append(end_time - edge_time)
+                    break
+        return latency_list
+
+    def report(self):
+        print("%-8s %8s %10s %8s %8s %12s" % ("phase", "seconds", "osc msg/s", "frames", "fps", "spi bytes"))
+        for index in range(len(self.phase_list) - 1):
+            name, start_time, osc_count, frame_count, spi_bytes = self.phase_list[index]
+            _, end_time, end_osc_count, end_frame_count, end_spi_bytes = self.phase_list[index + 1]
+            duration = max(end_time - start_time, 1e-6)
+            print("%-8s %8.2f %10.0f %8d %8.1f %12d" % (name, duration,
+                (end_osc_count - osc_count) / duration,
+                end_frame_count - frame_count,
+                (end_frame_count - frame_count) / duration,
+                end_spi_bytes - spi_bytes))
+        latency_list = self.get_press_latency_list()
+        print("button-to-frame latency over %d presses: p50 %.1fms p95 %.1fms p99 %.1fms max %.1fms" % (
+            len(latency_list),
+            percentile(latency_list, 50) * 1000,
+            percentile(latency_list, 95) * 1000,
+            percentile(latency_list, 99) * 1000,
+            max(latency_list, default=0.0) * 1000))
+
+def main():
+    parser = argparse.ArgumentParser(description="end-to-end load test with fake hardware")
+    parser.add_argument("--racks", type=int, default=1)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--params", type=int, default=8, help="params per page")
+    parser.add_argument("--flood", type=int, default=5000, help="changed messages sent after the publish")
+    parser.add_argument("--rate", type=float, default=2000, help="flood messages per second, 0 = unpaced")
+    parser.add_argument("--presses", type=int, default=30, help="Y button taps on a param row")
+    parser.add_argument("--press-interval", type=float, default=0.1)
+    parser.add_argument("--echo", action="store_true", help="let the MEC stand-in echo /Kontrol/changed back")
+    parser.add_argument("--hold", type=float, default=0, help="seconds to hold Y after the taps")
+    parser.add_argument("--mec-port", type=int, default=16000)
+    parser.add_argument("--osc-port", type=int, default=19001)
+    parser.add_argument("--stats", action="store_true", help="print the controller's stats socket reply at the end")
+    LoadHarness(parser.parse_args()).run()
+
+if __name__ == "__main__":
+    main()
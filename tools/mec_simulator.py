@@ -0,0 +1,172 @@
+# Local stand-in for the MEC Kontrol server: answers the controller's ping
+# with a synthetic rack publish and can flood it with /Kontrol/changed
+# messages. Runs inside the load harness or standalone:
+#
+#   python3 tools/mec_simulator.py --racks 2 --slots 8 --flood 10000 --rate 2000
+
+import argparse
+import random
+import socket
+import threading
+import time
+
+from pythonosc import osc_packet
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+class MecSimulator:
+    LISTEN_IP = "127.0.0.1"
+    LISTEN_PORT = 6000
+    # datagrams per second while publishing, 0 means no pacing
+    PUBLISH_RATE = 20000
+
+    sock = None
+    thread = None
+    client_address = None
+    running = False
+
+    def __init__(self, slot_count=4, page_count=4, param_count=8, listen_port=None, echo_changed=False, rack_count=1):
+        self.slot_count = slot_count
+        self.page_count = page_count
+        self.param_count = param_count
+        self.listen_port = self.LISTEN_PORT if listen_port is None else listen_port
+        # racks are named after the ORAC instances behind MEC
+        self.rack_id_list = ["%s:%d" % (self.LISTEN_IP, self.listen_port + 1 + rack_index) for rack_index in range(rack_count)]
+        # MEC broadcasts parameter changes back to every client, the sender included
+        self.echo_changed = echo_changed
+        self.published = threading.Event()
+        self.send_lock = threading.Lock()
+        self.received_count_map = {}
+        self.sent_count = 0
+
+    def log(self, log_text, *args):
+        print("[MecSimulator] " + (log_text % args if args else log_text))
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.LISTEN_IP, self.listen_port))
+        self.sock.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="MecSimulator", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        self.sock.close()
+
+    def run(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                packet = osc_packet.OscPacket(data)
+            except osc_packet.ParseError:
+                continue
+            for timed_msg in packet.messages:
+                self.handle_message(address, timed_msg.message)
+
+    def handle_message(self, address, msg):
+        count = self.received_count_map.get(msg.address, 0)
+        self.received_count_map[msg.address] = count + 1
+        if msg.address == "/Kontrol/changed" and self.echo_changed and self.client_address is not None:
+            self.send("/Kontrol/changed", *msg.params)
+            return
+        if msg.address != "/Kontrol/ping":
+            return
+        # /Kontrol/ping ii 9001 0
+        port, keepalive_seconds = msg.params[0], msg.params[1]
+        self.client_address = (address[0], port)
+        if keepalive_seconds == 0:
+            threading.Thread(target=self.publish, name="MecPublish", daemon=True).start()
+
+    def send(self, address, *args):
+        message_builder = OscMessageBuilder(address=address)
+        for arg in args:
+            message_builder.add_arg(arg)
+        with self.send_lock:
+            self.sock.sendto(message_builder.build().dgram, self.client_address)
+            self.sent_count += 1
+        if self.PUBLISH_RATE > 0 and not self.published.is_set():
+            time.sleep(1.0 / self.PUBLISH_RATE)
+
+    def get_slot_ids(self):
+        return ["s%d" % (slot_index + 1) for slot_index in range(self.slot_count)]
+
+    def get_param_ids(self):
+        return ["p%d" % (param_index + 1) for param_index in range(self.page_count * self.param_count)]
+
+    def publish(self):
+        self.published.clear()
+        self.send("/Kontrol/publishStart", len(self.rack_id_list))
+        for rack_id in self.rack_id_list:
+            self.publish_rack(rack_id)
+        self.published.set()
+        self.log("published %d racks of %d slots to %s:%d", len(self.rack_id_list), self.slot_count, *self.client_address)
+
+    def publish_rack(self, rack_id):
+        host, port = rack_id.split(":")
+        self.send("/Kontrol/rack", rack_id, host, int(port))
+        self.send("/Kontrol/resource", rack_id, "moduleorder", " ".join(self.get_slot_ids()))
+        for module_index in range(self.slot_count):
+            self.send("/Kontrol/resource", rack_id, "module", "synth/sim%d" % module_index)
+        self.send("/Kontrol/resource", rack_id, "preset", "Init")
+        self.send("/Kontrol/loadPreset", rack_id, "Init")
+        param_ids = self.get_param_ids()
+        for module_index, slot_id in enumerate(self.get_slot_ids()):
+            self.send("/Kontrol/module", rack_id, slot_id, "Sim %d" % module_index, "synth/sim%d" % module_index)
+            for page_index in range(self.page_count):
+                page_param_ids = param_ids[page_index * self.param_count:(page_index + 1) * self.param_count]
+                self.send("/Kontrol/page", rack_id, slot_id, "pg%d" % page_index, "Page %d" % (page_index + 1), *page_param_ids)
+            for param_id in param_ids:
+                self.send("/Kontrol/param", rack_id, slot_id, "pct", param_id, param_id.upper(), 0.0, 100.0, 50.0)
+            for param_id in param_ids:
+                self.send("/Kontrol/changed", rack_id, slot_id, param_id, 50.0)
+        self.send("/Kontrol/publishRackFinished", rack_id)
+
+    def flood(self, count, rate=0, slot_ids=None):
+        # random /Kontrol/changed traffic; rate 0 sends as fast as possible
+        slot_ids = self.get_slot_ids() if slot_ids is None else slot_ids
+        param_ids = self.get_param_ids()
+        start_time = time.monotonic()
+        for index in range(count):
+            self.send("/Kontrol/changed", random.choice(self.rack_id_list), random.choice(slot_ids), random.choice(param_ids), random.uniform(0.0, 100.0))
+            if rate > 0:
+                delay = start_time + (index + 1) / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        return time.monotonic() - start_time
+
+def main():
+    parser = argparse.ArgumentParser(description="MEC Kontrol server stand-in")
+    parser.add_argument("--port", type=int, default=MecSimulator.LISTEN_PORT)
+    parser.add_argument("--racks", type=int, default=1)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--params", type=int, default=8, help="params per page")
+    parser.add_argument("--flood", type=int, default=0, help="changed messages to send after the publish")
+    parser.add_argument("--rate", type=float, default=0, help="flood messages per second, 0 = unpaced")
+    parser.add_argument("--echo", action="store_true", help="echo received /Kontrol/changed messages back")
+    args = parser.parse_args()
+
+    mec = MecSimulator(args.slots, args.pages, args.params, args.port, args.echo, args.racks)
+    mec.start()
+    mec.log("listening on %s:%d", mec.LISTEN_IP, mec.listen_port)
+    try:
+        while True:
+            mec.published.wait()
+            if args.flood > 0:
+                elapsed = mec.flood(args.flood, args.rate)
+                mec.log("flooded %d changed messages in %.2fs", args.flood, elapsed)
+            mec.published.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mec.stop()
+
+if __name__ == "__main__":
+    main()
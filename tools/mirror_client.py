@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Connects to the controller's screen mirror and rebuilds the frame from the
+# streamed scanlines. Start the controller with
+#
+#   ORAC_MIRROR_SOCKET=/tmp/pirate-audio-orac.fb python3 pirate-audio-orac.py
+#
+# then save a PNG after every frame, or just watch the stream rate:
+#
+#   python3 tools/mirror_client.py /tmp/pirate-audio-orac.fb --png /tmp/screen.png
+#   python3 tools/mirror_client.py /tmp/pirate-audio-orac.fb --frames 100
+
+import argparse
+import socket
+import struct
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+MIRROR_MAGIC = b"ORFM"
+MIRROR_HEADER_FORMAT = ">4sBHHI"
+MIRROR_HELLO = 0
+MIRROR_ROWS = 1
+MIRROR_FRAME = 2
+
+class MirrorClient:
+    frame = None
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.stream = self.sock.makefile("rb")
+        self.frame_count = 0
+        self.row_count = 0
+        self.byte_count = 0
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+    def read_exactly(self, size):
+        data = self.stream.read(size)
+        if len(data) < size:
+            raise EOFError("mirror stream closed")
+        self.byte_count += size
+        return data
+
+    def read_frame(self):
+        # applies packets until the next end-of-frame marker
+        header_size = struct.calcsize(MIRROR_HEADER_FORMAT)
+        while True:
+            magic, kind, y0, y1, length = struct.unpack(MIRROR_HEADER_FORMAT, self.read_exactly(header_size))
+            if magic != MIRROR_MAGIC:
+                raise ValueError("not a screen mirror stream")
+            payload = self.read_exactly(length) if length > 0 else b""
+            if kind == MIRROR_HELLO:
+                # y0 / y1 carry the frame size
+                self.frame = np.zeros((y1, y0), dtype=np.uint16)
+            elif kind == MIRROR_ROWS:
+                rows = np.frombuffer(zlib.decompress(payload), dtype=">u2")
+                self.frame[y0:y1] = rows.reshape(y1 - y0, -1)
+                self.row_count += y1 - y0
+            elif kind == MIRROR_FRAME:
+                self.frame_count += 1
+                return self.frame
+
+    def get_image(self):
+        # RGB565 back to 8 bits per channel
+        frame = self.frame.astype(np.uint32)
+        rgb = np.dstack(((frame >> 11) << 3, ((frame >> 5) & 0x3f) << 2, (frame & 0x1f) << 3))
+        return Image.fromarray(rgb.astype(np.uint8), "RGB")
+
+def main():
+    parser = argparse.ArgumentParser(description="view the controller's screen mirror")
+    parser.add_argument("socket", help="path set in ORAC_MIRROR_SOCKET")
+    parser.add_argument("--png", help="write the latest frame to this file")
+    parser.add_argument("--frames", type=int, default=0, help="stop after N frames, 0 = run until closed")
+    args = parser.parse_args()
+
+    client = MirrorClient(args.socket)
+    start_time = time.monotonic()
+    try:
+        while args.frames <= 0 or client.frame_count < args.frames:
+            client.read_frame()
+            if args.png:
+                client.get_image().save(args.png)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        client.close()
+    duration = max(time.monotonic() - start_time, 1e-6)
+    print("%d frames, %d rows, %d bytes in %.2fs (%.1f frames/s, %.0f bytes/s)" % (
+        client.frame_count, client.row_count, client.byte_count, duration,
+        client.frame_count / duration, client.byte_count / duration))
+
+if __name__ == "__main__":
+    main()
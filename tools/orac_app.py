@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "pirate-audio-orac.py")
+
+def load_app():
+    # the controller script has a dash in its name, so it cannot be imported directly
+    if "pirate_audio_orac" in sys.modules:
+        return sys.modules["pirate_audio_orac"]
+    spec = importlib.util.spec_from_file_location("pirate_audio_orac", os.path.normpath(APP_PATH))
+    app = importlib.util.module_from_spec(spec)
+    sys.modules["pirate_audio_orac"] = app
+    spec.loader.exec_module(app)
+    return app
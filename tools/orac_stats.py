@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Queries the running controller's stats socket and prints the reply:
+#
+#   python3 tools/orac_stats.py                # counters, gauges and latency histograms as JSON
+#   python3 tools/orac_stats.py --watch 1      # repeat every second
+#   python3 tools/orac_stats.py log            # the log ring buffer
+
+import argparse
+import socket
+import time
+
+SOCKET_PATH = "/tmp/pirate-audio-orac.sock"
+
+def query(command="stats", path=SOCKET_PATH):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sock.sendall(command.encode("utf-8") + b"\n")
+        chunk_list = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunk_list.append(chunk)
+    finally:
+        sock.close()
+    return b"".join(chunk_list).decode("utf-8")
+
+def main():
+    parser = argparse.ArgumentParser(description="query the controller's stats socket")
+    parser.add_argument("command", nargs="?", default="stats", choices=["stats", "log"])
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--watch", type=float, default=0, help="repeat every N seconds")
+    args = parser.parse_args()
+    while True:
+        print(query(args.command, args.socket), end="", flush=True)
+        if args.watch <= 0:
+            break
+        time.sleep(args.watch)
+
+if __name__ == "__main__":
+    main()
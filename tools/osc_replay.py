@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Feeds the inbound packets of an OSC capture back into the controller's
+# dispatcher with the recorded timing, on fake hardware. Record a session on
+# the device with
+#
+#   ORAC_OSC_CAPTURE=/tmp/session.osc python3 pirate-audio-orac.py
+#
+# and replay it at 1x, Nx (--speed N) or as fast as possible (--speed 0):
+#
+#   python3 tools/osc_replay.py /tmp/session.osc --speed 4 --profile /tmp/replay.prof
+
+import argparse
+import cProfile
+import tempfile
+import threading
+import time
+
+import fake_hardware
+from load_harness import percentile
+
+class OscReplay:
+    def __init__(self, args):
+        self.args = args
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.app = fake_hardware.load_fake_app(self.cache_dir.name, args.mec_port, args.osc_port)
+        self.packet_list = [(offset, data) for offset, direction, data in self.app.OscCapture.read(args.capture)
+                if direction == self.app.PACKET_INBOUND]
+        self.client_address = (self.app.OscClient.MEC_SERVER_IP, args.mec_port)
+        self.lateness_list = []
+        self.handle_time_list = [] # (seconds spent in the dispatcher, capture offset)
+        self.replay_done = threading.Event()
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def deliver(self, offset, target_time, data):
+        start_time = time.monotonic()
+        self.lateness_list.append(start_time - target_time)
+        self.app.get_osc_client().dispatcher.call_handlers_for_packet(data, self.client_address)
+        self.handle_time_list.append((time.monotonic() - start_time, offset))
+
+    def finish(self):
+        self.end_time = time.monotonic()
+        self.replay_done.set()
+
+    def run_replay(self):
+        loop = self.app.get_event_loop()
+        speed = self.args.speed
+        try:
+            self.start_time = time.monotonic()
+            for offset, data in self.packet_list:
+                target_time = self.start_time + (offset / speed if speed > 0 else 0.0)
+                delay = target_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                loop.call_soon_threadsafe(self.deliver, offset, target_time, data)
+            loop.call_soon_threadsafe(self.finish)
+            self.replay_done.wait()
+            # let the last frames render before stopping
+            time.sleep(0.5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def run(self):
+        self.app.get_logger().set_level(self.app.LOG_WARNING)
+        threading.Thread(target=self.run_replay, name="OscReplay", daemon=True).start()
+        try:
+            if self.args.profile:
+                # profiles the event loop thread: OSC handling and model updates
+                cProfile.runctx("self.app.main()", globals(), locals(), self.args.profile)
+            else:
+                self.app.main()
+        finally:
+            self.cache_dir.cleanup()
+        self.report()
+
+    def report(self):
+        duration = max(self.end_time - self.start_time, 1e-6)
+        print("replayed %d packets in %.2fs (%.0f packets/s), %d frames" % (
+            len(self.handle_time_list), duration, len(self.handle_time_list) / duration,
+            self.app.get_render_worker().frame_count))
+        lateness_list = self.lateness_list
+        print("delivery lateness: p50 %.1fms p95 %.1fms p99 %.1fms max %.1fms" % (
+            percentile(lateness_list, 50) * 1000,
+            percentile(lateness_list, 95) * 1000,
+            percentile(lateness_list, 99) * 1000,
+            max(lateness_list, default=0.0) * 1000))
+        handle_time_list = [handle_time for handle_time, _ in self.handle_time_list]
+        print("dispatch time per packet: p50 %.3fms p99 %.3fms max %.3fms" % (
+            percentile(handle_time_list, 50) * 1000,
+            percentile(handle_time_list, 99) * 1000,
+            max(handle_time_list, default=0.0) * 1000))
+        print("slowest packets (capture offset):")
+        for handle_time, offset in sorted(self.handle_time_list, reverse=True)[:self.args.top]:
+            print("  %10.3fs %8.3fms" % (offset, handle_time * 1000))
+
+def main():
+    parser = argparse.ArgumentParser(description="replay an OSC capture into the controller")
+    parser.add_argument("capture", help="file written with ORAC_OSC_CAPTURE")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor, 0 = as fast as possible")
+    parser.add_argument("--profile", help="write cProfile stats of the event loop thread to this file")
+    parser.add_argument("--top", type=int, default=5, help="number of slowest packets to list")
+    parser.add_argument("--mec-port", type=int, default=16000)
+    parser.add_argument("--osc-port", type=int, default=19001)
+    OscReplay(parser.parse_args()).run()
+
+if __name__ == "__main__":
+    main()